@@ -0,0 +1,163 @@
+"""
+Headless batch export for NIDD Insights.
+
+Loads a set of reports once with the loaders in main.py (no Flask server) and then,
+in a process pool, writes into the output directory:
+- relations/<parameter>.json : get_relation result for every parameter
+- uml/<class>.mmd / .svg / .pdf : diagram of every class (plus "All Classes")
+- index.json : parameter / class name -> output file name
+
+Files that already exist are skipped, so an interrupted run is resumed by starting it again.
+
+Usage:
+    python batch_export.py uploads/NIDD_Parameter_Report_ClassC_Shared.xlsm --out export --workers 4 --formats mmd,pdf
+"""
+import argparse # for command-line options
+import hashlib # for collision-free file names
+import json # for relation output
+import os # for file system operations
+import sys # for progress output
+import time # for progress timing
+from concurrent.futures import ProcessPoolExecutor, as_completed # for parallel export
+
+os.environ.setdefault("NIDD_WATCH_UPLOADS", "0") # no uploads watcher in batch runs
+os.environ["NIDD_PRELOAD"] = "" # the batch loads its own report set, never the server's boot preload
+import main # loaders, relation engine and diagram renderers
+
+FORMATS = ("mmd", "svg", "pdf") # supported diagram formats
+options = {} # export options, set in every process by init_worker
+
+
+def init_worker(file_paths, export_options):
+    """Process pool initializer: load the reports unless inherited from the parent (fork)"""
+    options.update(export_options) # depths and formats
+    if not main.uml_data: # spawned worker (e.g. Windows): ingest once per worker
+        main.load_uml_data(file_paths)
+        main.load_excel_data(file_paths)
+
+
+def output_names(names):
+    """Deterministic, unique file names for parameters / classes"""
+    used = set() # names already taken
+    result = {} # name -> file name
+    for name in sorted(names):
+        base = main.create_safe_node_id(name) # filesystem-safe
+        if base in used: # two names sanitize to the same id
+            base = f"{base}_{hashlib.md5(name.encode('utf-8')).hexdigest()[:8]}"
+        used.add(base)
+        result[name] = base
+    return result
+
+
+def write_atomic(path, data):
+    """Write a file so an interrupted run never leaves a partial output behind"""
+    tmp_path = path + ".tmp" # temporary file next to the target
+    with open(tmp_path, "wb") as f:
+        f.write(data.encode("utf-8") if isinstance(data, str) else data)
+    os.replace(tmp_path, path) # atomic rename
+
+
+def export_relation(parameter, path):
+    """Write the get_relation result of one parameter"""
+    result = main.compute_relation(parameter, options["dependent_depth"], options["indirect_depth"], options["file_paths"]) # relation sets
+    result = {"parameter": parameter, "full_name": main.abbrev_to_param.get(parameter, ""), **result} # add context
+    write_atomic(path, json.dumps(result, indent=2))
+
+
+def export_class(class_name, base_path):
+    """Write the diagram of one class in every requested format"""
+    classes = main.select_uml_classes(class_name, options["depth"]) # classes to draw
+    if "mmd" in options["formats"]:
+        write_atomic(base_path + ".mmd", "\n".join(main.mermaid_lines({cls: main.uml_data[cls] for cls in classes})))
+    if "svg" in options["formats"]:
+        write_atomic(base_path + ".svg", main.render_class_tree_svg(classes))
+    if "pdf" in options["formats"]:
+        write_atomic(base_path + ".pdf", main.render_class_tree_pdf(classes, class_name.split("/")[-1]))
+
+
+def run_task(task):
+    """Run one export task in a worker; returns the task for progress reporting"""
+    kind, name, path = task
+    if kind == "relation":
+        export_relation(name, path)
+    else:
+        export_class(name, path)
+    return task
+
+
+def is_done(task, formats):
+    """True if every output of the task already exists (resume support)"""
+    kind, _, path = task
+    if kind == "relation":
+        return os.path.exists(path)
+    return all(os.path.exists(f"{path}.{fmt}") for fmt in formats)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Export relations and UML diagrams for every parameter and class.")
+    parser.add_argument("files", nargs="+", help="Excel reports (.xlsx/.xlsm/.xls)")
+    parser.add_argument("--out", default="export", help="output directory (default: export)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--what", choices=["all", "relations", "uml"], default="all", help="what to export")
+    parser.add_argument("--formats", default="mmd", help="diagram formats, comma-separated: mmd,svg,pdf")
+    parser.add_argument("--depth", type=int, default=1, help="UML depth below each class")
+    parser.add_argument("--dependent-depth", type=int, default=1, help="get_relation dependent_depth")
+    parser.add_argument("--indirect-depth", type=int, default=1, help="get_relation indirect_depth")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()] # requested formats
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+    file_paths = [os.path.abspath(path) for path in args.files] # absolute paths for workers
+    missing = [path for path in file_paths if not os.path.exists(path)]
+    if missing:
+        parser.error(f"file(s) not found: {', '.join(missing)}")
+
+    # Ingest once in the parent; forked workers inherit the loaded model
+    started = time.time()
+    main.load_uml_data(file_paths) # UML model
+    main.load_excel_data(file_paths) # parameter model
+    main.get_relation_graph(file_paths) # relation adjacency
+    print(f"Loaded {len(main.parameters_list)} parameters and {len(main.uml_data)} classes "
+          f"in {time.time() - started:.1f}s", file=sys.stderr)
+
+    relations_dir = os.path.join(args.out, "relations") # relation output
+    uml_dir = os.path.join(args.out, "uml") # diagram output
+    os.makedirs(relations_dir, exist_ok=True)
+    os.makedirs(uml_dir, exist_ok=True)
+
+    relation_names = output_names(main.parameters_list) if args.what in ("all", "relations") else {} # parameter -> file
+    class_names = output_names(list(main.uml_data.keys()) + ["All Classes"]) if args.what in ("all", "uml") else {} # class -> file
+    with open(os.path.join(args.out, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"relations": {name: f"relations/{base}.json" for name, base in relation_names.items()},
+                   "uml": {name: f"uml/{base}" for name, base in class_names.items()}}, f, indent=2)
+
+    tasks = [("relation", name, os.path.join(relations_dir, base + ".json")) for name, base in relation_names.items()]
+    tasks += [("uml", name, os.path.join(uml_dir, base)) for name, base in class_names.items()]
+    pending = [task for task in tasks if not is_done(task, formats)] # resume: skip finished outputs
+    print(f"{len(tasks) - len(pending)} of {len(tasks)} outputs already present, exporting {len(pending)}", file=sys.stderr)
+
+    export_options = {"file_paths": file_paths, "formats": formats, "depth": args.depth,
+                      "dependent_depth": args.dependent_depth, "indirect_depth": args.indirect_depth}
+    report_every = max(1, len(pending) // 100) # about 100 progress lines
+    failures = 0 # failed tasks
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(file_paths, export_options)) as executor:
+        futures = {executor.submit(run_task, task): task for task in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            kind, name, _ = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Failed {kind} {name}: {e}", file=sys.stderr)
+            if done % report_every == 0 or done == len(pending):
+                print(f"[{done}/{len(pending)}] {time.time() - started:.1f}s", file=sys.stderr)
+
+    print(f"Done: {len(pending) - failures} exported, {failures} failed -> {args.out}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__': # pragma: no cover
+    sys.exit(main_cli())
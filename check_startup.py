@@ -0,0 +1,55 @@
+"""
+Startup check for NIDD Insights: imports main.py in a fresh interpreter and fails when
+- a heavy module (pandas, numpy, openpyxl, reportlab) is imported eagerly, or
+- the import takes longer than the budget.
+
+Usage:
+    python check_startup.py --budget-ms 500
+"""
+import argparse # for command-line options
+import json # for the child's report
+import os # for the child's environment
+import subprocess # for a fresh interpreter
+import sys # for the exit code
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "reportlab") # must load on first use only
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({{"import_ms": (time.perf_counter() - started) * 1000,
+                  "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def measure():
+    """Import main in a child interpreter; returns {"import_ms", "heavy"}"""
+    env = dict(os.environ, NIDD_WATCH_UPLOADS="0", NIDD_PRELOAD="") # nothing in the background
+    here = os.path.dirname(os.path.abspath(__file__)) # main.py lives next to this script
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=here, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1]) # last line is the report
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when importing main.py is slow or loads heavy modules eagerly.")
+    parser.add_argument("--budget-ms", type=float, default=500, help="maximum import time (best of --runs)")
+    parser.add_argument("--runs", type=int, default=3, help="imports to measure (cold caches vary)")
+    args = parser.parse_args(argv)
+
+    results = [measure() for _ in range(max(1, args.runs))]
+    best = min(result["import_ms"] for result in results) # least disturbed run
+    heavy = sorted({name for result in results for name in result["heavy"]})
+    print(f"import main: {best:.0f} ms (budget {args.budget_ms:.0f} ms), eager heavy modules: {', '.join(heavy) or 'none'}")
+    if heavy:
+        print("FAIL: heavy modules must be imported lazily", file=sys.stderr)
+        return 1
+    if best > args.budget_ms:
+        print("FAIL: import time over budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__': # pragma: no cover
+    sys.exit(main_cli())
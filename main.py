@@ -1,20 +1,74 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for #, send_file
+import time # for boot timing and the uploads watcher
+BOOT_STARTED = time.perf_counter() # import-time budget starts here
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename # for secure file names
-import pandas as pd # for Excel handling
+import importlib # for lazy heavy imports
 import os # for file system operations
-from collections import defaultdict, deque # for data structures
+from collections import defaultdict # for data structures
 import shutil # for file operations
 import re # for regex operations
-from reportlab.lib.pagesizes import letter, A4, landscape # for PDF generation
-from reportlab.lib.utils import ImageReader # for image handling
-from reportlab.pdfgen import canvas # for PDF generation
-from io import BytesIO # for in-memory file operations
+from io import BytesIO, TextIOWrapper # for in-memory file operations
 import base64 # for encoding images
+import sqlite3 # for the optional model store
+import json # for model store metadata
+from contextlib import closing # for short-lived store connections
+import threading # for background indexing
+import atexit # for releasing the uploads watcher lock
+import multiprocessing # for background parser processes
+from concurrent.futures import ProcessPoolExecutor, Future # for background parser processes and shared results
+from collections import OrderedDict # for the relation result cache
+from itertools import chain # for appending diff styles to streams
+from functools import partial, wraps # for worker callbacks and route decorators
+import math # for Retry-After estimates
+import mmap # for the shared model snapshot
+import struct # for the snapshot header
+from array import array # for snapshot arrays
+from collections.abc import Mapping # for read-only snapshot views
+from bisect import bisect_left # for prefix lookups
+import sys # for the import-time budget report
+import hashlib # for report diff row hashes
+
+
+class LazyImport:
+    """Module placeholder: imports the module on first attribute access, then replaces itself in globals()"""
+
+    def __init__(self, name, alias):
+        self.name = name # module to import
+        self.alias = alias # global name bound to this placeholder
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.name) # first use pays the import
+        globals()[self.alias] = module # later lookups hit the module directly
+        return getattr(module, attr)
+
+
+pd = LazyImport("pandas", "pd") # for Excel handling; only needed once a workbook is parsed
+np = LazyImport("numpy", "np") # for the sparse impact matrix
 
 app = Flask(__name__) # Flask app initialization
 app.secret_key = 'keyyyy' # Secret key for session management
 app.config['UPLOAD_FOLDER'] = 'uploads' # Folder to store uploaded files
 app.config['TEMP_FOLDER'] = 'temp_uploads' # Temporary folder for session files
+app.config['MODEL_STORE'] = os.environ.get('NIDD_MODEL_STORE', '') # Optional SQLite model store file (empty = disabled)
+app.config['WATCH_UPLOADS'] = os.environ.get('NIDD_WATCH_UPLOADS', '1') == '1' # Pre-parse workbooks dropped into uploads/
+app.config['WATCH_INTERVAL'] = float(os.environ.get('NIDD_WATCH_INTERVAL', '5')) # Seconds between uploads/ scans
+app.config['PREPARSE_WORKERS'] = int(os.environ.get('NIDD_PREPARSE_WORKERS', '1')) # Background parser processes
+app.config['PARSED_CACHE_SIZE'] = int(os.environ.get('NIDD_PARSED_CACHE_SIZE', '8')) # Parsed workbooks kept in memory per process
+app.config['SVG_CACHE_SIZE'] = int(os.environ.get('NIDD_SVG_CACHE_SIZE', '32')) # Cached server-side SVG layouts
+app.config['MODEL_SNAPSHOT'] = os.environ.get('NIDD_MODEL_SNAPSHOT', '') # Shared mmap model file for multi-worker setups (empty = disabled)
+app.config['RELATION_CACHE_SIZE'] = int(os.environ.get('NIDD_RELATION_CACHE_SIZE', '1024')) # Cached /get-relation results (0 = disabled)
+app.config['PRELOAD_FILES'] = [f for f in os.environ.get('NIDD_PRELOAD', '').split(os.pathsep) if f] # Report set loaded at boot (names in uploads/ or paths)
+app.config['IMPORT_BUDGET_MS'] = float(os.environ.get('NIDD_IMPORT_BUDGET_MS', '0')) # Warn when importing main.py takes longer (0 = off)
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.environ.get('NIDD_MAX_REQUEST_MB', '100')) * 1024 * 1024) # Larger request bodies get 413
+app.config['MAX_IMAGE_BYTES'] = int(float(os.environ.get('NIDD_MAX_IMAGE_MB', '20')) * 1024 * 1024) # Base64 diagram images for /download-pdf
+app.config['ADMISSION_LIMITS'] = { # concurrent requests per heavy endpoint group
+    "upload": int(os.environ.get('NIDD_LIMIT_UPLOAD', '2')), # report loads: /upload-main, /upload-to-folder, /select-available-files, /reload-data
+    "uml": int(os.environ.get('NIDD_LIMIT_UML', '4')), # /uml
+    "pdf": int(os.environ.get('NIDD_LIMIT_PDF', '2')), # /download-pdf
+    "analysis": int(os.environ.get('NIDD_LIMIT_ANALYSIS', '2')) # whole-report work: /impact-matrix, /fan-counts, /diff-reports
+}
+app.config['ADMISSION_QUEUE'] = int(os.environ.get('NIDD_ADMISSION_QUEUE', '8')) # Requests allowed to wait per group (beyond that: 429)
+app.config['ADMISSION_WAIT'] = float(os.environ.get('NIDD_ADMISSION_WAIT', '10')) # Seconds a queued request waits before 503
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True) # Ensure upload folder exists
 os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True) # Ensure temp folder exists
@@ -23,11 +77,38 @@ os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True) # Ensure temp folder exist
 # parameters_list now contains ABBREVIATIONS (what shows in dropdown)
 parameters_list = []  # used by dropdown: ONLY abbreviations
 parameter_relations = {}  # key: ABBREVIATION (col D), value: list of related ABBREVIATIONS (from col P)
-uml_data = defaultdict(lambda: {
-    "attributes": [],
-    "relationships": set(),
-    "multiplicities": {}
-}) # UML data structure
+def new_uml_data():
+    return defaultdict(lambda: {
+        "attributes": [],
+        "relationships": set(),
+        "multiplicities": {}
+    }) # UML data structure
+
+
+uml_data = new_uml_data() # class -> attributes / relationships / multiplicities
+
+# Class hierarchy index, rebuilt by build_class_hierarchy() after every UML load
+# class -> {"parent", "children", "depth", "attribute_count", "subtree_size", "subtree_attributes"}
+class_hierarchy = {}
+
+# Server-side SVG layouts, keyed by (uml_model_version, class, depth, view, max_classes, diff_key)
+uml_model_version = 0 # bumped on every UML load so stale layouts are never served
+uml_svg_cache = OrderedDict() # least recently used first
+tree_height_memo = {"version": None, "height": 0} # deepest class level of the current model
+
+# Corpus-wide inverted index over every workbook in uploads/
+corpus_index = {} # lowercase term -> list of hits {"file", "sheet", "row", "kind", "value", "moc"}
+corpus_files = {} # filename -> {"size", "mtime_ns", "hits"} (what is indexed per file)
+corpus_terms = [] # sorted terms for prefix lookups
+corpus_pending = set() # filenames an index job is parsing right now
+corpus_lock = threading.Lock() # guards the four structures above
+corpus_state = {"building": False, "built": False, "scanned": 0.0} # background scan status / start of the last full scan
+
+# Parsed workbooks, keyed by (filename, size, mtime) so session copies of an uploads/ file hit the same entry
+parsed_file_cache = OrderedDict() # key -> {"parameters": rows, "uml": rows, "edges": rows}, least recently used first
+parsed_file_paths = {} # key -> paths the workbook was read from (what the watcher's cleanup checks)
+parsed_file_lock = threading.Lock() # guards parsed_file_cache and parsed_file_paths
+watcher_state = {"started": False, "checked": 0.0, "pending": set(), "done": set()} # uploads watcher status / last lock attempt / keys being parsed / keys pre-parsed once
 
 # NEW: mappings for Option A
 abbrev_to_param = {}   # abbrev -> Full Parameter Name (col C)
@@ -77,6 +158,30 @@ def parse_related_cell(cell_value): # Parse Column P cell into list of abbreviat
     return out
 
 
+def extract_related_cell(cell): # Column P cleaner used by get_relation
+    """
+    Parse a Column P cell the way get_relation reads it.
+    - Items separated by ';', '::suffix' removed
+    - 'PREFIX-ABBR' items keep only the part after the last '-'
+    """
+    if pd.isna(cell):
+        return [] ## handle NaN
+    s = str(cell).strip()
+    if not s:
+        return [] # empty cell
+    items = [] # output list
+    for part in s.split(";"): # split by ';'
+        part = part.strip() # trim whitespace
+        if not part:
+            continue
+        part = re.sub(r"::.*$", "", part)     # remove ::public etc.
+        if "-" in part:
+            part = part.split("-")[-1].strip() # take part after last '-'
+        if part:
+            items.append(part) # add to list
+    return items # return list of related parameters
+
+
 # --------- Parameter Relation Finder ---------
 def detect_header(df, search_columns): #  detect header row
     """Auto-detect header row by looking for keywords""" 
@@ -88,6 +193,91 @@ def detect_header(df, search_columns): #  detect header row
     return 0 # default to first row if not found
 
 
+def parse_relation_edges(file_path):
+    """
+    Read the Column D -> Column P edges of one workbook exactly as get_relation sees them.
+    - first sheet, header on the first row
+    - D values as stripped strings, P cells cleaned by extract_related_cell
+    Returns a list of (src, dst) tuples.
+    """
+    edges = [] # output list
+    df = pd.read_excel(file_path, engine='openpyxl') # read Excel file
+    if df.shape[1] < 16: # must have at least 16 columns
+        return edges
+    col_D = df.columns[3] # Column D(abbreviation)
+    col_P = df.columns[15] # Column P(related list)
+    for src, cell in zip(df[col_D].astype(str).str.strip(), df[col_P]): # one row at a time
+        for dst in extract_related_cell(cell): # related parameters
+            edges.append((src, dst)) # forward edge
+    return edges
+
+
+def load_relation_edges(file_paths):
+    """Relation edges of all files as (file_index, src, dst) tuples"""
+    edges = [] # output list
+    for file_index, excel_path in enumerate(file_paths):
+        edges.extend((file_index, src, dst) for src, dst in get_parsed_file(excel_path, "edges")) # tag with file
+    return edges
+
+
+def parse_parameter_file(file_path, df_sheets=None):
+    """
+    Parse one workbook into parameter rows for load_excel_data.
+    Returns a list of (abbrev, full_name, related_abbrevs) tuples in sheet order.
+    df_sheets: sheets already read with header=None (pre-parsing shares them with index_workbook).
+    """
+    rows = [] # output list
+    # read all sheets, no header so we can detect header row manually
+    if df_sheets is None:
+        try:
+            df_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl', header=None) # no header
+        except Exception:
+            # fallback to default read if any issue
+            df_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl') # default read
+
+    for sheet_name, df in df_sheets.items(): 
+        # skip tiny sheets
+        if df.shape[1] < 16: # must have at least 16 columns
+            continue
+
+        # detect header row heuristically
+        header_row = detect_header(df, search_columns=["Parameter", "Parameter Name", "Abbreviation", "Relation", "Related"]) # detect header
+        df.columns = df.iloc[header_row] # set header
+        df = df.iloc[header_row + 1:].reset_index(drop=True) # data below header
+
+        # Column indexes according to your request:
+        # C -> index 2, D -> index 3, P -> index 15
+        try:
+            col_full = df.columns[2]   # Column C (Full Parameter Name)
+            col_abbr = df.columns[3]   # Column D (Abbreviation)
+            col_rel = df.columns[15]   # Column P (Related list)
+        except Exception:
+            # If headers messed up, skip this sheet
+            continue
+
+        df_clean = df.dropna(subset=[col_full], how='all') # drop rows without full name
+
+        for _, row in df_clean.iterrows(): # iterate rows
+            full_name = str(row[col_full]).strip() if pd.notna(row[col_full]) else "" # full name
+            abbrev = str(row[col_abbr]).strip() if pd.notna(row[col_abbr]) else "" # abbreviation
+            related_cell = row[col_rel] if col_rel in df.columns else "" # related cell
+
+            # If abbreviation is empty, fallback to a cleaned form of full_name
+            if not abbrev or abbrev.lower() in ['nan', 'none']: # generate from full name
+                abbrev = re.sub(r'\s+', '_', full_name).strip() if full_name else "" # replace spaces with underscores
+
+            if not full_name or not abbrev: 
+                # skip rows without a full name
+                continue
+
+            # parse relations from Column P (convert to abbrev list)
+            rels = parse_related_cell(related_cell)
+            # sanitize and dedupe
+            rels = [r for r in [x.strip() for x in rels] if r and r.lower() not in ['nan', 'none', '']] # sanitize
+            rows.append((abbrev, full_name, rels)) # one parameter row
+    return rows
+
+
 def load_excel_data(file_paths):
     """
     Load parameter data from multiple Excel files.
@@ -106,185 +296,1662 @@ def load_excel_data(file_paths):
 
     try:
         for file_path in file_paths:
-            # read all sheets, no header so we can detect header row manually
-            try:
-                df_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl', header=None) # no header
-            except Exception:
-                # fallback to default read if any issue
-                df_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl') # default read
-
-            for sheet_name, df in df_sheets.items(): 
-                # skip tiny sheets
-                if df.shape[1] < 16: # must have at least 16 columns
-                    continue
-
-                # detect header row heuristically
-                header_row = detect_header(df, search_columns=["Parameter", "Parameter Name", "Abbreviation", "Relation", "Related"]) # detect header
-                df.columns = df.iloc[header_row] # set header
-                df = df.iloc[header_row + 1:].reset_index(drop=True) # data below header
-
-                # Column indexes according to your request:
-                # C -> index 2, D -> index 3, P -> index 15
-                try:
-                    col_full = df.columns[2]   # Column C (Full Parameter Name)
-                    col_abbr = df.columns[3]   # Column D (Abbreviation)
-                    col_rel = df.columns[15]   # Column P (Related list)
-                except Exception:
-                    # If headers messed up, skip this sheet
-                    continue
+            for abbrev, full_name, rels in get_parsed_file(file_path, "parameters"): # pre-parsed when warm
+                # register mappings
+                abbrev_to_param[abbrev] = full_name # map abbrev to full name
+                # keep first abbreviation if multiple map to same full name; prefer abbrev
+                if full_name not in param_to_abbrev:
+                    param_to_abbrev[full_name] = abbrev # map full name to abbrev
+
+                if rels: # if there are related abbreviations
+                    existing = parameter_relations.get(abbrev, []) # existing relations
+                    combined = list(set(existing + rels)) # combine and dedupe
+                    parameter_relations[abbrev] = combined # update with combined list
+                else:
+                    # ensure the key exists with empty list rather than a string
+                    if abbrev not in parameter_relations: 
+                        parameter_relations[abbrev] = [] # empty list
 
-                df_clean = df.dropna(subset=[col_full], how='all') # drop rows without full name
+        # sort dropdown alphabetically and keep unique
+        parameters_list = sorted(abbrev_to_param) # every registered abbreviation
+        clear_relation_cache() # results of the previous model are stale
 
-                for _, row in df_clean.iterrows(): # iterate rows
-                    full_name = str(row[col_full]).strip() if pd.notna(row[col_full]) else "" # full name
-                    abbrev = str(row[col_abbr]).strip() if pd.notna(row[col_abbr]) else "" # abbreviation
-                    related_cell = row[col_rel] if col_rel in df.columns else "" # related cell
+        if app.config['MODEL_STORE']: # persist to the optional SQLite store
+            store_parameter_model(file_paths)
 
-                    # If abbreviation is empty, fallback to a cleaned form of full_name
-                    if not abbrev or abbrev.lower() in ['nan', 'none']: # generate from full name
-                        abbrev = re.sub(r'\s+', '_', full_name).strip() if full_name else "" # replace spaces with underscores
+    except Exception as e: # log any error
+        print(f"Failed to load Excel: {e}") # log error
 
-                    if not full_name: 
-                        # skip rows without a full name
-                        continue
 
-                    # register mappings
-                    if abbrev:
-                        abbrev_to_param[abbrev] = full_name # map abbrev to full name
-                        # keep first abbreviation if multiple map to same full name; prefer abbrev
-                        if full_name not in param_to_abbrev:
-                            param_to_abbrev[full_name] = abbrev # map full name to abbrev
-                    else:
-                        # no abbrev: still add mapping keyed by generated abbrev
-                        continue
+# --------- UML Diagram Generator (UNCHANGED) ---------
+def parse_uml_file(file_path):
+    """
+    Parse one workbook into UML rows for load_uml_data.
+    Returns a list of (class_name, attribute, multiplicity) tuples in sheet order.
+    """
+    rows = [] # output list
+    df = pd.read_excel(file_path, sheet_name=None, engine='openpyxl') # read all sheets
 
-                    # add to dropdown list (unique)
-                    if abbrev and abbrev not in parameters_list:
-                        parameters_list.append(abbrev) # add abbrev to list
-
-                    # parse relations from Column P (convert to abbrev list)
-                    rels = parse_related_cell(related_cell)
-                    # sanitize and dedupe
-                    rels = [r for r in [x.strip() for x in rels] if r and r.lower() not in ['nan', 'none', '']] # sanitize
-                    if rels: # if there are related abbreviations
-                        existing = parameter_relations.get(abbrev, []) # existing relations
-                        combined = list(set(existing + rels)) # combine and dedupe
-                        parameter_relations[abbrev] = combined # update with combined list
-                    else:
-                        # ensure the key exists with empty list rather than a string
-                        if abbrev not in parameter_relations: 
-                            parameter_relations[abbrev] = [] # empty list
+    for sheet in df: # process each sheet
+        data = df[sheet] # get sheet data
+        if data.shape[1] < 31: # must have at least 31 columns
+            continue
 
-        # sort dropdown alphabetically and keep unique
-        parameters_list = sorted(list(set(parameters_list))) 
+        data = data.rename(columns={
+            data.columns[1]: "MOC_Name", # Column B
+            data.columns[2]: "Parameter_Name", # Column C
+            data.columns[3]: "Abbreviation", # Column D
+            data.columns[4]: "Data_Type", # Column E
+            data.columns[5]: "Parent_Parameter", # Column F
+            data.columns[25]: "Required_On_Creation", # Column Z
+            data.columns[27]: "Required_On_Creation_Col_AB", # Column AB
+            data.columns[28]: "Modification", # Column AC
+            data.columns[29]: "MinOccurs", # Column AD
+            data.columns[30]: "MaxOccurs" # Column AE
+        }) # rename relevant columns
+
+        data = data.dropna(subset=["MOC_Name", "Parameter_Name"], how='all') # drop rows without class or param name
+
+        for _, row in data.iterrows(): # iterate rows
+            class_name = str(row["MOC_Name"]).strip() # class name
+            param_name = str(row["Parameter_Name"]).strip() # parameter name
+            abbreviation = str(row["Abbreviation"]).strip() if pd.notna(row["Abbreviation"]) else param_name # abbrev fallback
+            data_type = str(row["Data_Type"]).strip() # data type
+            mod_status = str(row["Modification"]).strip().lower() # modification status
+            required = str(row["Required_On_Creation"]).strip().lower() # required status
+            required_col_ab = str(row["Required_On_Creation_Col_AB"]).strip().lower() if pd.notna(row["Required_On_Creation_Col_AB"]) else required # required col AB
+            parent = str(row["Parent_Parameter"]).strip() if pd.notna(row["Parent_Parameter"]) else None # parent param
+            min_occurs = str(row["MinOccurs"]).strip() if pd.notna(row["MinOccurs"]) else "" # min occurs
+            max_occurs = str(row["MaxOccurs"]).strip() if pd.notna(row["MaxOccurs"]) else ""  # max occurs
+
+            if (param_name.lower() == "parameter name" or # skip header rows
+                class_name.lower() in ['nan', 'none', ''] or # skip invalid
+                param_name.lower() in ['nan', 'none', ''] or # skip invalid
+                not class_name or not param_name or # skip empty
+                class_name == 'nan' or param_name == 'nan'): 
+                continue
 
-    except Exception as e: # log any error
-        print(f"Failed to load Excel: {e}") # log error
+            if "bts" in mod_status:
+                color = "red" # red for BTS
+            elif "on-line" in mod_status:
+                color = "green" # green for on-line
+            elif "not modifiable" in mod_status:
+                color = "gray" # gray for not modifiable
+            else:
+                color = "black" # default black
+
+            if "mandatory" in required_col_ab:
+                mand = "(M)" # mandatory
+            elif "optional" in required_col_ab:
+                mand = "(O)" # optional
+            elif "system" in required_col_ab or "value set by" in required_col_ab:
+                mand = "(S)" # system
+            else:
+                mand = "" # unknown
+
+            multiplicity = "" # default multiplicity
+            if min_occurs and min_occurs.lower() != 'nan' and max_occurs and max_occurs.lower() != 'nan': # both present
+                multiplicity = f"{min_occurs}..{max_occurs}" # both
+            elif min_occurs and min_occurs.lower() != 'nan': # only min present
+                multiplicity = f"{min_occurs}..*" # min to many
+            elif max_occurs and max_occurs.lower() != 'nan': # only max present
+                multiplicity = f"0..{max_occurs}" # zero to max
+
+            rows.append((class_name, {
+                "name": abbreviation, # parameter name
+                "type": data_type, # data type
+                "mandatory": mand, # mandatory status
+                "color": color, # color based on mod status
+                "parent": parent # parent parameter
+            }, multiplicity)) # one attribute row
+    return rows
 
 
-# --------- UML Diagram Generator (UNCHANGED) ---------
 def load_uml_data(file_paths):
     """Load UML data from multiple Excel files"""
-    global uml_data # reset UML data
-    uml_data.clear() # reset UML data
+    global uml_data, uml_model_version, class_hierarchy # swapped in once the new model is complete
+    data = new_uml_data() # new model, built off to the side (requests keep reading the previous one)
     all_classes = set() # set of all class names
+    class_edges = {} # class path -> list of (parent, child) edges
 
     try:
         for file_path in file_paths: # process each file
             if not os.path.exists(file_path): # skip missing files
                 continue
 
-            df = pd.read_excel(file_path, sheet_name=None, engine='openpyxl') # read all sheets
+            for class_name, attribute, multiplicity in get_parsed_file(file_path, "uml"): # pre-parsed when warm
+                data[class_name]["attributes"].append(attribute) # add attribute to class
 
-            for sheet in df: # process each sheet
-                data = df[sheet] # get sheet data
-                if data.shape[1] < 31: # must have at least 31 columns
+                if "/" in class_name:
+                    edges = class_edges.get(class_name) # split each class path only once
+                    if edges is None:
+                        parts = class_name.split("/") # split by '/'
+                        edges = [("/".join(parts[:i]), "/".join(parts[:i + 1])) for i in range(1, len(parts))] # (parent, child) pairs
+                        class_edges[class_name] = edges # remember edges for this class path
+                        for parent_class, child_class in edges:
+                            data[parent_class]["relationships"].add(child_class) # add relationship
+
+                    if multiplicity:
+                        for parent_class, child_class in edges:
+                            data[parent_class]["multiplicities"][child_class] = multiplicity # set multiplicity
+
+                all_classes.add(class_name) # add to all classes set
+
+        hierarchy = build_class_hierarchy(data) # index parents, depths and subtree stats once
+        uml_data, class_hierarchy = data, hierarchy # swap in the complete model
+        uml_model_version += 1 # after the swap: layouts keyed by the new version see the new model
+        uml_svg_cache.clear() # drop layouts of the previous model
+        if app.config['MODEL_STORE']: # persist to the optional SQLite store
+            store_uml_model(file_paths)
+        return sorted(all_classes) # return sorted list of all classes
+    except Exception as e:
+        print(f"Error loading UML data: {e}") # log error
+        return []
+
+
+# --------- Parsed workbook cache / uploads watcher ---------
+def file_cache_key(file_path):
+    """Cache key of a workbook: name, size and modification time"""
+    stat = os.stat(file_path) # copy2 keeps size and mtime, so session copies match
+    return (os.path.basename(file_path), stat.st_size, stat.st_mtime_ns) # ns: a same-second replacement is a new key
+
+
+def get_parsed_file(file_path, kind, keep=True):
+    """
+    Rows of one workbook for 'parameters', 'uml', 'edges' or 'hits', parsed once and cached.
+    keep=False parses a cold workbook without caching it (corpus scans must not evict the loads' workbooks).
+    """
+    key = file_cache_key(file_path) # cache key
+    with parsed_file_lock:
+        entry = parsed_file_cache.get(key)
+        if entry and kind in entry: # warm
+            parsed_file_cache.move_to_end(key) # most recently used
+            parsed_file_paths[key].add(file_path) # e.g. a session copy of an uploads/ file
+            return entry[kind]
+    parser = {"parameters": parse_parameter_file, "uml": parse_uml_file, "edges": parse_relation_edges, "hits": index_workbook}[kind] # cold: parse now
+    rows = parser(file_path)
+    if keep:
+        cache_parsed(key, {kind: rows}, file_path) # keep for next load
+    return rows
+
+
+def cache_parsed(key, rows_by_kind, file_path):
+    """Add parsed rows of one workbook, evicting least recently used workbooks beyond PARSED_CACHE_SIZE"""
+    with parsed_file_lock:
+        parsed_file_cache.setdefault(key, {}).update(rows_by_kind)
+        parsed_file_cache.move_to_end(key)
+        parsed_file_paths.setdefault(key, set()).add(file_path)
+        while len(parsed_file_cache) > app.config['PARSED_CACHE_SIZE']:
+            evicted, _ = parsed_file_cache.popitem(last=False)
+            parsed_file_paths.pop(evicted, None)
+
+
+def path_holds(file_path, key):
+    """True if file_path still is the workbook cached under key"""
+    try:
+        return file_cache_key(file_path) == key
+    except OSError: # deleted
+        return False
+
+
+def drop_stale_parsed():
+    """Drop cached workbooks that none of their known paths holds any more (deleted, replaced or session cleared)"""
+    with parsed_file_lock:
+        tracked = {key: set(paths) for key, paths in parsed_file_paths.items()} # stat outside the lock
+    gone = {key: {path for path in paths if not path_holds(path, key)} for key, paths in tracked.items()} # one stat per path
+    with parsed_file_lock:
+        for key, dead in gone.items():
+            if key not in parsed_file_paths:
+                continue # evicted meanwhile
+            parsed_file_paths[key] -= dead
+            if not parsed_file_paths[key]: # no file left to load it from
+                del parsed_file_paths[key]
+                parsed_file_cache.pop(key, None)
+
+
+def preparse_workbook(file_path):
+    """Parse everything the loaders and the corpus index need from one workbook (runs in a worker process)"""
+    raw_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl', header=None) # shared by hits and parameters
+    return {
+        "hits": index_workbook(file_path, raw_sheets), # first: parse_parameter_file relabels the frames
+        "parameters": parse_parameter_file(file_path, raw_sheets),
+        "uml": parse_uml_file(file_path),
+        "edges": parse_relation_edges(file_path)
+    }
+
+
+def lower_worker_priority():
+    """Worker process initializer: stay behind request handling"""
+    if hasattr(os, "nice"): # not available on Windows
+        os.nice(10)
+
+
+def store_preparsed(key, path, future):
+    """Worker callback: put a pre-parsed workbook into the cache, then index it from the cached rows"""
+    try:
+        cache_parsed(key, future.result(), path) # warm entry
+    except Exception as e:
+        print(f"Error pre-parsing {key[0]}: {e}") # log error
+    finally:
+        watcher_state["pending"].discard(key) # no longer in flight
+    schedule_corpus_update([key[0]]) # corpus scans skipped it while it was in flight
+
+
+def acquire_lock_file(lock_path, timeout):
+    """Create the lock file atomically; False if another process holds one refreshed within timeout seconds"""
+    for _ in range(2): # second try after removing an abandoned lock
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock_path).st_mtime < timeout:
+                    return False
+                os.remove(lock_path) # holder died
+            except FileNotFoundError:
+                pass # released meanwhile: try again
+    return False
+
+
+def release_lock_file(lock_path, inode):
+    """Remove the lock file if it is still the one this process created"""
+    try:
+        if os.stat(lock_path).st_ino == inode:
+            os.remove(lock_path)
+    except OSError:
+        pass # already gone
+
+
+def watch_uploads(lock_path, inode):
+    """Poll uploads/: pre-parse new or changed workbooks, drop entries of deleted or replaced ones"""
+    executor = ProcessPoolExecutor(max_workers=app.config['PREPARSE_WORKERS'], initializer=lower_worker_priority,
+                                   mp_context=multiprocessing.get_context("spawn")) # low-priority parser pool
+    known = None # workbook keys seen on the previous scan
+    while True:
+        try:
+            if os.stat(lock_path).st_ino != inode: # taken over after we stalled
+                break
+            os.utime(lock_path) # still watching
+        except OSError: # removed: another process may start its own watcher
+            break
+        try:
+            upload_folder = app.config['UPLOAD_FOLDER'] # uploads folder
+            current = {} # key -> path
+            for filename in os.listdir(upload_folder):
+                file_path = os.path.join(upload_folder, filename) # full path
+                if os.path.isfile(file_path) and filename.lower().endswith(('.xls', '.xlsx', '.xlsm')):
+                    current[file_cache_key(file_path)] = file_path
+
+            drop_stale_parsed() # deleted, replaced or no longer used
+            with parsed_file_lock:
+                newest = sorted(current, key=lambda k: k[2], reverse=True)[:app.config['PARSED_CACHE_SIZE']] # only what fits the cache
+                missing = [key for key in newest if key not in watcher_state["done"]] # pre-parse each workbook once; evicted ones parse on demand
+            watcher_state["done"] &= set(current) # forget deleted or replaced workbooks
+
+            for key in missing:
+                if key in watcher_state["pending"]: # already queued
                     continue
+                watcher_state["pending"].add(key)
+                watcher_state["done"].add(key)
+                executor.submit(preparse_workbook, current[key]).add_done_callback(partial(store_preparsed, key, current[key]))
+
+            if known != set(current): # folder changed: refresh the corpus index too
+                schedule_corpus_update()
+                known = set(current)
+        except Exception as e:
+            print(f"Error watching uploads: {e}") # log error
+        time.sleep(app.config['WATCH_INTERVAL']) # poll interval
+    executor.shutdown(wait=False)
+    watcher_state["started"] = False # retried by the next request
+
+
+def start_upload_watcher():
+    """
+    Start the uploads watcher thread in one process per host (e.g. one of the gunicorn workers).
+    The others retry every WATCH_INTERVAL and take over once the holder's lock goes stale.
+    """
+    now = time.time()
+    if watcher_state["started"] or now - watcher_state["checked"] < app.config['WATCH_INTERVAL']:
+        return
+    watcher_state["checked"] = now
+    lock_path = os.path.join(app.config['TEMP_FOLDER'], "watch.lock") # shared by every process serving this folder
+    if not acquire_lock_file(lock_path, max(30.0, 3 * app.config['WATCH_INTERVAL'])): # refreshed on every poll
+        return
+    watcher_state["started"] = True
+    inode = os.stat(lock_path).st_ino # identifies our lock file
+    atexit.register(release_lock_file, lock_path, inode) # let a restarted server take over right away
+    threading.Thread(target=watch_uploads, args=(lock_path, inode), daemon=True).start() # background polling
+
+
+@app.before_request # first request of a serving process starts the watcher
+def start_background_workers():
+    if app.config['WATCH_UPLOADS']:
+        start_upload_watcher()
+
+
+def build_class_hierarchy(classes):
+    """
+    Build the bidirectional class hierarchy index of a UML model (uml_data shape).
+    - parent pointer and sorted children list for every class
+    - depth (roots are 0)
+    - attribute_count, subtree_size and subtree_attributes (class itself included)
+    """
+    class_hierarchy = {} # new index (callers rebind the global)
+    for cls, info in classes.items(): # one node per class
+        class_hierarchy[cls] = {
+            "parent": None, # parent class (None for roots)
+            "children": sorted(info["relationships"]), # child classes
+            "depth": 0, # distance from root
+            "attribute_count": len(info["attributes"]), # own attributes
+            "subtree_size": 1, # classes in subtree
+            "subtree_attributes": len(info["attributes"]) # attributes in subtree
+        }
+
+    for cls, node in class_hierarchy.items(): # set parent pointers
+        for child in node["children"]:
+            if child in class_hierarchy:
+                class_hierarchy[child]["parent"] = cls # child -> parent
+
+    order = [cls for cls, node in class_hierarchy.items() if node["parent"] is None] # start from roots
+    for cls in order: # BFS order (list grows while iterating)
+        for child in class_hierarchy[cls]["children"]:
+            if child in class_hierarchy:
+                class_hierarchy[child]["depth"] = class_hierarchy[cls]["depth"] + 1 # one level below parent
+                order.append(child) # visit child later
+
+    for cls in reversed(order): # children before parents
+        parent = class_hierarchy[cls]["parent"]
+        if parent is not None:
+            class_hierarchy[parent]["subtree_size"] += class_hierarchy[cls]["subtree_size"] # roll up size
+            class_hierarchy[parent]["subtree_attributes"] += class_hierarchy[cls]["subtree_attributes"] # roll up attributes
+    return class_hierarchy
+
+
+def get_class_ancestors(cls):
+    """Return ancestors of a class from root down to its direct parent"""
+    ancestors = [] # output list
+    node = class_hierarchy.get(cls) # start node
+    while node and node["parent"] is not None:
+        ancestors.append(node["parent"]) # add parent
+        node = class_hierarchy.get(node["parent"]) # walk up
+    return ancestors[::-1] # root first
+
+
+def get_class_siblings(cls):
+    """Return classes sharing the same parent (roots are siblings of each other)"""
+    node = class_hierarchy.get(cls) # class node
+    if not node:
+        return []
+    if node["parent"] is None:
+        peers = [c for c, n in class_hierarchy.items() if n["parent"] is None] # other roots
+    else:
+        peers = class_hierarchy[node["parent"]]["children"] # parent's children
+    return [c for c in peers if c != cls] # exclude the class itself
+
+
+def class_tree_height():
+    """Deepest class level of the loaded model (computed once per model version)"""
+    global class_hierarchy
+    version = uml_model_version # read first: globals are swapped before the version is bumped
+    if tree_height_memo["version"] != version:
+        if not class_hierarchy:
+            class_hierarchy = build_class_hierarchy(uml_data)
+        tree_height_memo.update(version=version,
+                                height=max((node["depth"] for node in class_hierarchy.values()), default=0))
+    return tree_height_memo["height"]
+
+
+def get_class_subtree(cls, depth, max_classes=None):
+    """Return classes below cls up to depth levels, in BFS order, capped at max_classes"""
+    result = [cls] # start class
+    frontier = [cls] # current level
+    for _ in range(depth): # each level
+        next_frontier = [] # next level
+        for current in frontier:
+            for child in class_hierarchy.get(current, {}).get("children", []):
+                if max_classes is not None and len(result) >= max_classes: # size cap reached
+                    return result
+                result.append(child) # tree: each child is reached once
+                next_frontier.append(child) # explore later
+        if not next_frontier: # no more levels
+            break
+        frontier = next_frontier # move down
+    return result
+
+
+def class_dropdown_entries(classes):
+    """Build the /upload class list with per-class summary numbers"""
+    entries = [] # output list
+    for cls in classes:
+        node = class_hierarchy.get(cls, {}) # hierarchy info
+        entries.append({
+            "value": cls, # full class path
+            "label": cls.split("/")[-1], # short name
+            "depth": node.get("depth", 0), # hierarchy depth
+            "attributes": node.get("attribute_count", 0), # own attributes
+            "children": len(node.get("children", [])), # direct children
+            "subtree_size": node.get("subtree_size", 1), # classes in subtree
+            "subtree_attributes": node.get("subtree_attributes", 0) # attributes in subtree
+        })
+    return entries
+
+
+def select_uml_classes(selected_class, depth, view="subtree", max_classes=None):
+    """Return the classes to draw for a /uml request"""
+    global class_hierarchy
+    if selected_class == "All Classes":
+        return list(uml_data.keys()) # every class
+    if not class_hierarchy: # index missing (e.g. data loaded elsewhere)
+        class_hierarchy = build_class_hierarchy(uml_data)
+    if view == "ancestors": # path from root + siblings + the class itself
+        return get_class_ancestors(selected_class) + [selected_class] + get_class_siblings(selected_class)
+    return get_class_subtree(selected_class, depth, max_classes) # subtree below the class
+
+
+def mermaid_lines(classes_info):
+    """Build Mermaid graph lines for {class: {"attributes", "relationships", "multiplicities"}}"""
+    return [line for _, line in mermaid_fragments(classes_info)]
+
+
+def mermaid_fragments(classes_info):
+    """Yield ("graph" | "node" | "edge", line) one at a time, in mermaid_lines order"""
+    yield "graph", "graph TD" # start graph
+
+    for cls, info in classes_info.items(): # for each class
+        safe_cls = create_safe_node_id(cls) # safe node ID
+        display_name = sanitize_for_mermaid(cls.split("/")[-1]) # display name
+        
+        # Center-aligned class name
+        label_lines = [f"<div style='text-align:center;'><b>{display_name}</b></div>", "<hr>"] # center-aligned class name
+
+        attributes = info["attributes"] # all attributes
+        visible_attrs = attributes[:MAX_VISIBLE_ATTRIBUTES] # visible attributes
+        hidden_count = len(attributes) - MAX_VISIBLE_ATTRIBUTES # count of hidden attributes
+
+        # Left-aligned attributes with padding
+        for attr in visible_attrs:
+            attr_name = sanitize_for_mermaid(attr['name']) # add attribute line
+            attr_type = sanitize_for_mermaid(attr['type'])  # add attribute line
+            attr_mand = sanitize_for_mermaid(attr['mandatory']) # add attribute line
+            if not attr_name or attr_name == 'nan': 
+                continue # skip invalid
+            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:{attr['color']}'>+ {attr_name} : {attr_type} {attr_mand}</span></div>") # add attribute line
+
+        if hidden_count > 0:# indicate more
+            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:#3b82f6;font-weight:600;font-style:italic'>... +{hidden_count} more attributes</span></div>") # indicate more
 
-                data = data.rename(columns={
-                    data.columns[1]: "MOC_Name", # Column B
-                    data.columns[2]: "Parameter_Name", # Column C
-                    data.columns[3]: "Abbreviation", # Column D
-                    data.columns[4]: "Data_Type", # Column E
-                    data.columns[5]: "Parent_Parameter", # Column F
-                    data.columns[25]: "Required_On_Creation", # Column Z
-                    data.columns[27]: "Required_On_Creation_Col_AB", # Column AB
-                    data.columns[28]: "Modification", # Column AC
-                    data.columns[29]: "MinOccurs", # Column AD
-                    data.columns[30]: "MaxOccurs" # Column AE
-                }) # rename relevant columns
-
-                data = data.dropna(subset=["MOC_Name", "Parameter_Name"], how='all') # drop rows without class or param name
-
-                for _, row in data.iterrows(): # iterate rows
-                    class_name = str(row["MOC_Name"]).strip() # class name
-                    param_name = str(row["Parameter_Name"]).strip() # parameter name
-                    abbreviation = str(row["Abbreviation"]).strip() if pd.notna(row["Abbreviation"]) else param_name # abbrev fallback
-                    data_type = str(row["Data_Type"]).strip() # data type
-                    mod_status = str(row["Modification"]).strip().lower() # modification status
-                    required = str(row["Required_On_Creation"]).strip().lower() # required status
-                    required_col_ab = str(row["Required_On_Creation_Col_AB"]).strip().lower() if pd.notna(row["Required_On_Creation_Col_AB"]) else required # required col AB
-                    parent = str(row["Parent_Parameter"]).strip() if pd.notna(row["Parent_Parameter"]) else None # parent param
-                    min_occurs = str(row["MinOccurs"]).strip() if pd.notna(row["MinOccurs"]) else "" # min occurs
-                    max_occurs = str(row["MaxOccurs"]).strip() if pd.notna(row["MaxOccurs"]) else ""  # max occurs
-
-                    if (param_name.lower() == "parameter name" or # skip header rows
-                        class_name.lower() in ['nan', 'none', ''] or # skip invalid
-                        param_name.lower() in ['nan', 'none', ''] or # skip invalid
-                        not class_name or not param_name or # skip empty
-                        class_name == 'nan' or param_name == 'nan'): 
+        html_label = "<br>".join(label_lines).replace('"', '#quot;') # sanitize quotes
+        yield "node", f'{safe_cls}["{html_label}"]' # add class node
+
+    for cls, info in classes_info.items(): # for each class
+        from_cls = create_safe_node_id(cls) # source class
+        for rel in info["relationships"]:# for each relationship
+            if rel in classes_info:
+                to_cls = create_safe_node_id(rel) # target class
+                multiplicity = info["multiplicities"].get(rel, "") # get multiplicity
+                if multiplicity:
+                    multiplicity = sanitize_for_mermaid(multiplicity) # sanitize multiplicity
+                    yield "edge", f'{from_cls} -->|{multiplicity}| {to_cls}' # add relationship with multiplicity
+                else:
+                    yield "edge", f"{from_cls} --> {to_cls}" # add relationship
+
+
+# --------- Server-side layered layout (SVG) ---------
+SVG_CHAR_WIDTH = 7 # approx. width of one character in px
+SVG_LINE_HEIGHT = 18 # height of one attribute line
+SVG_TITLE_HEIGHT = 26 # height of the class name band
+SVG_H_GAP = 40 # horizontal gap between sibling subtrees
+SVG_V_GAP = 70 # vertical gap between layers
+SVG_MARGIN = 20 # outer margin
+DIFF_STYLES = {"added": ("#dcfce7", "#16a34a"), "changed": ("#fef3c7", "#d97706")} # report diff highlight: (fill, stroke)
+
+
+def svg_escape(text):
+    """Escape text for SVG <text> content"""
+    text = ' '.join(str(text).split()) if text else "" # collapse whitespace
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def class_box_lines(cls):
+    """Return (title, [(text, color), ...]) for a class box, same content as the Mermaid node"""
+    title = cls.split("/")[-1] # display name
+    lines = [] # attribute lines
+    attributes = uml_data[cls]["attributes"] # all attributes
+    for attr in attributes[:MAX_VISIBLE_ATTRIBUTES]: # visible attributes
+        if not attr['name'] or attr['name'] == 'nan':
+            continue # skip invalid
+        lines.append((f"+ {attr['name']} : {attr['type']} {attr['mandatory']}".strip(), attr['color'])) # attribute line
+    hidden_count = len(attributes) - MAX_VISIBLE_ATTRIBUTES # count of hidden attributes
+    if hidden_count > 0:
+        lines.append((f"... +{hidden_count} more attributes", "#3b82f6")) # indicate more
+    return title, lines
+
+
+def layout_class_tree(classes):
+    """
+    Layered (Sugiyama-style) layout of the selected classes.
+    - layers: depth below the nearest selected ancestor
+    - ordering: children keep hierarchy order, so tree edges never cross
+    - x: each subtree gets its own band, parents centered over their children
+    Returns {class: (x, y, width, height)}.
+    """
+    selected = set(classes) # quick membership
+    children = {cls: [c for c in class_hierarchy.get(cls, {}).get("children", []) if c in selected] for cls in classes} # edges inside selection
+    roots = [cls for cls in classes if class_hierarchy.get(cls, {}).get("parent") not in selected] # top of each drawn tree
+
+    sizes = {} # class -> (width, height)
+    for cls in classes:
+        title, lines = class_box_lines(cls) # box content
+        longest = max([len(title)] + [len(text) for text, _ in lines]) # widest line
+        sizes[cls] = (max(140, longest * SVG_CHAR_WIDTH + 24), SVG_TITLE_HEIGHT + 10 + SVG_LINE_HEIGHT * len(lines)) # box size
+
+    layer_of = {} # class -> layer index
+    layers = [] # layer index -> classes
+    for root in roots: # assign layers top-down
+        stack = [(root, 0)]
+        while stack:
+            cls, layer = stack.pop()
+            layer_of[cls] = layer # layer index
+            while len(layers) <= layer:
+                layers.append([])
+            layers[layer].append(cls) # add to layer
+            stack.extend((child, layer + 1) for child in children[cls]) # next layer
+
+    layer_y = [] # layer index -> y
+    y = SVG_MARGIN
+    for layer in layers:
+        layer_y.append(y) # top of layer
+        y += max(sizes[cls][1] for cls in layer) + SVG_V_GAP # tallest box + gap
+
+    band = {} # class -> width of its subtree band
+    for layer in reversed(layers): # children before parents
+        for cls in layer:
+            child_span = sum(band[c] for c in children[cls]) + SVG_H_GAP * max(0, len(children[cls]) - 1) # children side by side
+            band[cls] = max(sizes[cls][0], child_span) # wide enough for node and children
+
+    positions = {} # class -> (x, y, w, h)
+    left = SVG_MARGIN
+    for root in roots: # roots side by side
+        stack = [(root, left)]
+        while stack:
+            cls, band_left = stack.pop()
+            w, h = sizes[cls] # box size
+            positions[cls] = (band_left + (band[cls] - w) / 2, layer_y[layer_of[cls]], w, h) # center in band
+            child_span = sum(band[c] for c in children[cls]) + SVG_H_GAP * max(0, len(children[cls]) - 1) # children width
+            child_left = band_left + (band[cls] - child_span) / 2 # center children under parent
+            for child in children[cls]:
+                stack.append((child, child_left)) # place child band
+                child_left += band[child] + SVG_H_GAP # next child
+        left += band[root] + SVG_H_GAP # next root
+    return positions
+
+
+def render_class_tree_svg(classes, highlight=None):
+    """Render the selected classes as a positioned SVG document; highlight maps classes to added / changed"""
+    positions = layout_class_tree(classes) # compute layout
+    width = max([x + w for x, _, w, _ in positions.values()] + [0]) + SVG_MARGIN # canvas width
+    height = max([y + h for _, y, _, h in positions.values()] + [0]) + SVG_MARGIN # canvas height
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" viewBox="0 0 {width:.0f} {height:.0f}" font-family="Arial, sans-serif" font-size="12">'] # root element
+    parts.append('<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="#333"/></marker></defs>') # arrow head
+
+    for cls in classes: # edges first so boxes paint over them
+        if cls not in positions:
+            continue
+        px, py, pw, ph = positions[cls] # parent box
+        for child in class_hierarchy.get(cls, {}).get("children", []):
+            if child not in positions:
+                continue
+            cx, cy, cw, _ = positions[child] # child box
+            x1, y1, x2, y2 = px + pw / 2, py + ph, cx + cw / 2, cy # bottom center -> top center
+            mid = y1 + (y2 - y1) / 2 # elbow height
+            parts.append(f'<path d="M {x1:.1f} {y1:.1f} V {mid:.1f} H {x2:.1f} V {y2:.1f}" fill="none" stroke="#333" stroke-width="1.5" marker-end="url(#arrow)"/>') # orthogonal edge
+            multiplicity = uml_data[cls]["multiplicities"].get(child, "") # edge label
+            if multiplicity:
+                parts.append(f'<text x="{x2 + 4:.1f}" y="{y2 - 8:.1f}" fill="#333">{svg_escape(multiplicity)}</text>') # multiplicity
+
+    for cls in classes: # class boxes
+        if cls not in positions:
+            continue
+        x, y, w, h = positions[cls] # box geometry
+        title, lines = class_box_lines(cls) # box content
+        status = (highlight or {}).get(cls) # report diff status, if any
+        fill, stroke = DIFF_STYLES.get(status, ("#ECECFF", "#9370DB")) # box colours
+        diff_attr = f' data-diff="{status}"' if status else ""
+        parts.append(f'<g class="node" data-class="{svg_escape(cls)}"{diff_attr}>') # group per class
+        parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" fill="{fill}" stroke="{stroke}" stroke-width="{2 if status else 1.5}"/>') # box
+        parts.append(f'<text x="{x + w / 2:.1f}" y="{y + 17:.1f}" text-anchor="middle" font-weight="bold">{svg_escape(title)}</text>') # class name
+        parts.append(f'<line x1="{x:.1f}" y1="{y + SVG_TITLE_HEIGHT:.1f}" x2="{x + w:.1f}" y2="{y + SVG_TITLE_HEIGHT:.1f}" stroke="#9370DB"/>') # separator
+        for i, (text, color) in enumerate(lines): # attribute lines
+            parts.append(f'<text x="{x + 8:.1f}" y="{y + SVG_TITLE_HEIGHT + 16 + i * SVG_LINE_HEIGHT:.1f}" fill="{color}">{svg_escape(text)}</text>')
+        parts.append('</g>')
+
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def render_class_tree_pdf(classes, title):
+    """Draw the selected classes with the server-side layout straight into a PDF (no browser needed)"""
+    from reportlab.pdfgen import canvas # PDF export only: keep reportlab out of startup
+    from reportlab.lib import colors
+    positions = layout_class_tree(classes) # compute layout
+    width = max([x + w for x, _, w, _ in positions.values()] + [0]) + SVG_MARGIN # page width
+    height = max([y + h for _, y, _, h in positions.values()] + [0]) + SVG_MARGIN + 40 # page height (+ title band)
+    flip = lambda y: height - y # layout y grows downwards, PDF y upwards
+
+    pdf_buffer = BytesIO() # PDF buffer
+    c = canvas.Canvas(pdf_buffer, pagesize=(width, height)) # page sized to the diagram
+    c.setFont("Helvetica-Bold", 16) # title font
+    c.drawCentredString(width / 2, height - 24, f"UML Class Diagram - {title}") # title
+
+    offset = 40 # title band above the diagram
+    c.setStrokeColor(colors.HexColor("#333333")) # edges
+    for cls in classes:
+        if cls not in positions:
+            continue
+        px, py, pw, ph = positions[cls] # parent box
+        for child in class_hierarchy.get(cls, {}).get("children", []):
+            if child not in positions:
+                continue
+            cx, cy, cw, _ = positions[child] # child box
+            x1, y1, x2, y2 = px + pw / 2, py + ph + offset, cx + cw / 2, cy + offset # bottom center -> top center
+            mid = y1 + (y2 - y1) / 2 # elbow height
+            c.lines([(x1, flip(y1), x1, flip(mid)), (x1, flip(mid), x2, flip(mid)), (x2, flip(mid), x2, flip(y2))]) # orthogonal edge
+            multiplicity = uml_data[cls]["multiplicities"].get(child, "") # edge label
+            if multiplicity:
+                c.setFont("Helvetica", 9)
+                c.setFillColor(colors.HexColor("#333333"))
+                c.drawString(x2 + 4, flip(y2 - 8), multiplicity) # multiplicity
+
+    for cls in classes: # class boxes
+        if cls not in positions:
+            continue
+        x, y, w, h = positions[cls] # box geometry
+        y += offset # below the title band
+        box_title, lines = class_box_lines(cls) # box content
+        c.setFillColor(colors.HexColor("#ECECFF")) # box fill
+        c.setStrokeColor(colors.HexColor("#9370DB")) # box border
+        c.rect(x, flip(y + h), w, h, stroke=1, fill=1) # box
+        c.line(x, flip(y + SVG_TITLE_HEIGHT), x + w, flip(y + SVG_TITLE_HEIGHT)) # separator
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica-Bold", 10)
+        c.drawCentredString(x + w / 2, flip(y + 17), box_title) # class name
+        c.setFont("Helvetica", 9)
+        for i, (text, color) in enumerate(lines): # attribute lines
+            c.setFillColor(colors.toColor(color, colors.black))
+            c.drawString(x + 8, flip(y + SVG_TITLE_HEIGHT + 16 + i * SVG_LINE_HEIGHT), text)
+
+    c.save() # save PDF
+    return pdf_buffer.getvalue()
+
+
+# --------- Optional SQLite model store ---------
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS parameters (abbrev TEXT PRIMARY KEY, full_name TEXT);
+CREATE TABLE IF NOT EXISTS relations (file_id INTEGER, src TEXT, dst TEXT);
+CREATE INDEX IF NOT EXISTS idx_relations_fwd ON relations (file_id, src);
+CREATE INDEX IF NOT EXISTS idx_relations_rev ON relations (file_id, dst);
+CREATE TABLE IF NOT EXISTS classes (
+    name TEXT PRIMARY KEY, parent TEXT, multiplicity TEXT, depth INTEGER,
+    attribute_count INTEGER, subtree_size INTEGER, subtree_attributes INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_classes_parent ON classes (parent);
+CREATE TABLE IF NOT EXISTS attributes (
+    class_name TEXT, position INTEGER, name TEXT, type TEXT, mandatory TEXT, color TEXT, parent TEXT,
+    PRIMARY KEY (class_name, position)
+);
+"""
+
+
+def store_connect(create=False):
+    """Open the model store; writers pass create=True to ensure the schema, readers open it as is"""
+    conn = sqlite3.connect(app.config['MODEL_STORE']) # one short-lived connection per call
+    if create:
+        conn.executescript(STORE_SCHEMA) # ensure tables exist
+    return conn
+
+
+def files_signature(file_paths):
+    """Identify a report set by file name, size and modification time"""
+    files = [] # (name, size, mtime)
+    for path in file_paths:
+        if os.path.exists(path):
+            stat = os.stat(path) # size and mtime survive the copy into the session folder
+            files.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return json.dumps(files) # ordered like file_paths (file_id order)
+
+
+def store_ready(kind, file_paths):
+    """True if the store holds the 'parameter' or 'uml' model built from these files"""
+    if not app.config['MODEL_STORE'] or not file_paths or not os.path.exists(app.config['MODEL_STORE']):
+        return False
+    try:
+        with closing(store_connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (f"{kind}_files",)).fetchone() # stored signature
+    except sqlite3.Error: # not written by this app yet (no schema)
+        return False
+    return bool(row) and row[0] == files_signature(file_paths)
+
+
+def store_parameter_model(file_paths):
+    """Write parameters and relation edges of the loaded parameter model"""
+    edges = load_relation_edges(file_paths) # get_relation view of the workbooks
+    with closing(store_connect(create=True)) as conn, conn:
+        conn.execute("DELETE FROM parameters") # replace previous model
+        conn.execute("DELETE FROM relations")
+        conn.executemany("INSERT OR REPLACE INTO parameters VALUES (?, ?)",
+                         [(abbrev, abbrev_to_param.get(abbrev, "")) for abbrev in parameters_list]) # dropdown entries
+        conn.executemany("INSERT INTO relations VALUES (?, ?, ?)", edges) # indexed both ways
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('parameter_files', ?)", (files_signature(file_paths),)) # mark complete
+
+
+def store_uml_model(file_paths):
+    """Write classes (with hierarchy stats) and attributes of the loaded UML model"""
+    class_rows = [] # classes table rows
+    attribute_rows = [] # attributes table rows
+    for cls, info in uml_data.items():
+        node = class_hierarchy.get(cls, {}) # hierarchy stats
+        parent = node.get("parent") # parent class
+        multiplicity = uml_data[parent]["multiplicities"].get(cls, "") if parent in uml_data else "" # edge label
+        class_rows.append((cls, parent, multiplicity, node.get("depth", 0), node.get("attribute_count", 0),
+                           node.get("subtree_size", 1), node.get("subtree_attributes", 0)))
+        for position, attr in enumerate(info["attributes"]): # keep sheet order
+            attribute_rows.append((cls, position, attr["name"], attr["type"], attr["mandatory"], attr["color"], attr["parent"]))
+
+    with closing(store_connect(create=True)) as conn, conn:
+        conn.execute("DELETE FROM classes") # replace previous model
+        conn.execute("DELETE FROM attributes")
+        conn.executemany("INSERT INTO classes VALUES (?, ?, ?, ?, ?, ?, ?)", class_rows)
+        conn.executemany("INSERT INTO attributes VALUES (?, ?, ?, ?, ?, ?, ?)", attribute_rows)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('uml_files', ?)", (files_signature(file_paths),)) # mark complete
+
+
+def store_get_parameters():
+    """Dropdown abbreviations from the store"""
+    with closing(store_connect()) as conn:
+        return [row[0] for row in conn.execute("SELECT abbrev FROM parameters ORDER BY abbrev")]
+
+
+def store_get_relation(P, dependent_depth, indirect_depth, annotate=False):
+    """
+    Answer get_relation from the store, one file at a time like the workbook scan.
+    Annotations match compute_relation: the shortest level of a parameter and its smallest predecessor one level up.
+    """
+    dependent_set = set() # dependents within dependent_depth
+    dependency_set = set() # direct dependencies
+    indirect_set = set() # indirect relations
+    reached = {"dependent": {}, "dependency": {}, "indirect": {}} # param -> (level, via), first file wins ties
+
+    def note(kind, rows, offset=0): # keep the lowest level over all files
+        for param, level, via in rows:
+            level += offset
+            if param not in reached[kind] or level < reached[kind][param][0]:
+                reached[kind][param] = (level, via)
+
+    with closing(store_connect()) as conn:
+        file_ids = [row[0] for row in conn.execute("SELECT DISTINCT file_id FROM relations ORDER BY file_id")]
+        for file_id in file_ids:
+            # 1️⃣ dependents: forward walk up to dependent_depth, then the BFS level and predecessor per node
+            rows = conn.execute("""
+                WITH RECURSIVE walk(node, lvl) AS (
+                    SELECT ?, 0
+                    UNION
+                    SELECT r.dst, w.lvl + 1 FROM walk w
+                    JOIN relations r ON r.file_id = ? AND r.src = w.node
+                    WHERE w.lvl < ?
+                ),
+                dist AS (SELECT node, MIN(lvl) AS lvl FROM walk GROUP BY node)
+                SELECT d.node, d.lvl, (SELECT MIN(r.src) FROM relations r JOIN dist p ON p.node = r.src AND p.lvl = d.lvl - 1
+                                       WHERE r.file_id = ? AND r.dst = d.node)
+                FROM dist d WHERE d.node != ?""", (P, file_id, dependent_depth, file_id, P)).fetchall()
+            dependent_set |= {row[0] for row in rows}
+            if annotate:
+                note("dependent", rows)
+
+            direct_dependents = {row[0] for row in conn.execute(
+                "SELECT dst FROM relations WHERE file_id = ? AND src = ?", (file_id, P))} # one step forward
+
+            # 2️⃣ dependencies: one step backward
+            dependencies = {row[0] for row in conn.execute(
+                "SELECT src FROM relations WHERE file_id = ? AND dst = ? AND src != ''", (file_id, P))}
+            dependency_set |= dependencies
+            if annotate:
+                note("dependency", [(dep, 1, P) for dep in dependencies])
+
+            # 3️⃣ indirect: undirected walk from dependents and dependencies (seeds are one hop from P)
+            seeds = direct_dependents | dependency_set
+            rows = conn.execute("""
+                WITH RECURSIVE walk(node, lvl) AS (
+                    SELECT value, 0 FROM json_each(?)
+                    UNION
+                    SELECT CASE WHEN r.src = w.node THEN r.dst ELSE r.src END, w.lvl + 1 FROM walk w
+                    JOIN relations r ON r.file_id = ? AND (r.src = w.node OR r.dst = w.node)
+                        AND NOT (r.dst = w.node AND r.src = '') -- empty Column D is never a dependency
+                    WHERE w.lvl < ?
+                ),
+                dist AS (SELECT node, MIN(lvl) AS lvl FROM walk GROUP BY node)
+                SELECT d.node, d.lvl, (SELECT MIN(p.node) FROM dist p JOIN relations r ON r.file_id = ?
+                                           AND ((r.src = p.node AND r.dst = d.node) OR (r.dst = p.node AND r.src = d.node AND r.src != ''))
+                                       WHERE p.lvl = d.lvl - 1)
+                FROM dist d WHERE d.lvl > 0""", (json.dumps(sorted(seeds)), file_id, indirect_depth, file_id)).fetchall()
+            indirect_set |= {row[0] for row in rows} # seeds have level 0, so none of them is here
+            if annotate:
+                note("indirect", rows, offset=1)
+
+    indirect_set -= dependent_set # remove direct dependents
+    indirect_set -= dependency_set # remove direct dependencies
+    indirect_set.discard(P) # remove P itself if present
+    result = {"dependent": sorted(dependent_set), "dependency": sorted(dependency_set), "indirect": sorted(indirect_set)}
+    if annotate:
+        result["annotations"] = {kind: {param: {"level": reached[kind][param][0], "via": reached[kind][param][1]}
+                                        for param in result[kind]} for kind in reached}
+    return result
+
+
+def store_get_classes():
+    """/upload class entries (with summary numbers) from the store"""
+    with closing(store_connect()) as conn:
+        rows = conn.execute("""
+            SELECT c.name, c.depth, c.attribute_count, c.subtree_size, c.subtree_attributes,
+                   (SELECT COUNT(*) FROM classes k WHERE k.parent = c.name)
+            FROM classes c ORDER BY c.name""").fetchall()
+    return [{"value": name, "label": name.split("/")[-1], "depth": depth, "attributes": attrs,
+             "children": children, "subtree_size": size, "subtree_attributes": subtree_attrs}
+            for name, depth, attrs, size, subtree_attrs, children in rows]
+
+
+def store_get_uml_classes(selected_class, depth, view="subtree", max_classes=None):
+    """Load the classes a /uml request needs from the store, in uml_data shape"""
+    with closing(store_connect()) as conn:
+        if selected_class == "All Classes":
+            names = [row[0] for row in conn.execute("SELECT name FROM classes ORDER BY depth, name")]
+        elif view == "ancestors": # path to root plus siblings
+            names = [row[0] for row in conn.execute("""
+                WITH RECURSIVE up(name, parent) AS (
+                    SELECT name, parent FROM classes WHERE name = ?
+                    UNION ALL
+                    SELECT c.name, c.parent FROM classes c JOIN up ON c.name = up.parent
+                )
+                SELECT name FROM up""", (selected_class,))][::-1] # root first
+            siblings = conn.execute("SELECT name FROM classes WHERE parent IS (SELECT parent FROM classes WHERE name = ?) AND name != ? ORDER BY name",
+                                    (selected_class, selected_class)).fetchall()
+            names += [row[0] for row in siblings]
+        else: # subtree down to depth, in get_class_subtree's BFS order (by parent's position, then by name)
+            names = [row[0] for row in conn.execute(f"""
+                WITH RECURSIVE down(name, lvl, path) AS (
+                    SELECT name, 0, name FROM classes WHERE name = ?
+                    UNION ALL
+                    SELECT c.name, d.lvl + 1, d.path || char(1) || c.name FROM classes c JOIN down d ON c.parent = d.name
+                    WHERE d.lvl < ?
+                )
+                SELECT name FROM down ORDER BY lvl, path{' LIMIT ?' if max_classes else ''}""",
+                (selected_class, depth) + ((max_classes,) if max_classes else ()))]
+
+        classes_info = {name: {"attributes": [], "relationships": set(), "multiplicities": {}} for name in names} # uml_data shape
+        for chunk_start in range(0, len(names), 500): # stay below SQLite's parameter limit
+            chunk = names[chunk_start:chunk_start + 500]
+            marks = ",".join("?" * len(chunk))
+            for cls, name, type_, mandatory, color, parent in conn.execute(
+                    f"SELECT class_name, name, type, mandatory, color, parent FROM attributes WHERE class_name IN ({marks}) ORDER BY class_name, position", chunk):
+                classes_info[cls]["attributes"].append({"name": name, "type": type_, "mandatory": mandatory, "color": color, "parent": parent})
+            for name, parent, multiplicity in conn.execute(
+                    f"SELECT name, parent, multiplicity FROM classes WHERE name IN ({marks})", chunk):
+                if parent in classes_info: # edge inside the selection
+                    classes_info[parent]["relationships"].add(name)
+                    if multiplicity:
+                        classes_info[parent]["multiplicities"][name] = multiplicity
+    return classes_info
+
+
+def load_uml_from_store():
+    """Fill uml_data and class_hierarchy from the store (e.g. after a restart), for views that lay out the whole model"""
+    global uml_data, class_hierarchy, uml_model_version
+    classes = new_uml_data() # same shape as load_uml_data
+    classes.update(store_get_uml_classes("All Classes", 0))
+    uml_data, class_hierarchy = classes, build_class_hierarchy(classes) # swap in the complete model
+    uml_model_version += 1 # new model for layout caches
+    uml_svg_cache.clear()
+
+
+# --------- Relation graph (Column D -> Column P) ---------
+relation_graph_cache = {} # files_signature -> (forward, reverse) adjacency per file
+
+
+def get_relation_graph(file_paths):
+    """
+    Per-file adjacency of the relation edges, built once per report set.
+    Returns (forward, reverse): lists with one {abbrev: [abbrevs]} dict per file.
+    """
+    signature = files_signature(file_paths) # report set identity
+    snapshot = model_snapshot["reader"] # shared mmap model, if attached
+    if snapshot is not None and snapshot.header["files"] == signature:
+        return snapshot.relation_graph() # zero-copy adjacency
+    graph = relation_graph_cache.get(signature)
+    if graph is None:
+        forward = [defaultdict(list) for _ in file_paths] # src -> dsts
+        reverse = [defaultdict(list) for _ in file_paths] # dst -> srcs
+        for file_index, src, dst in load_relation_edges(file_paths):
+            forward[file_index][src].append(dst) # dependent edge
+            if src: # empty Column D never counts as a dependency
+                reverse[file_index][dst].append(src) # dependency edge
+        graph = (forward, reverse)
+        relation_graph_cache.clear() # keep only the current report set
+        relation_graph_cache[signature] = graph
+    return graph
+
+
+def compute_relation(P, dependent_depth, indirect_depth, file_paths, annotate=False):
+    """
+    DEPENDENT (forward):
+        Row where Column D == P → Column P contains dependent parameters.
+        Uses BFS with dependent_depth.
+
+    DEPENDENCY (backward):
+        Row where cleaned P contains P → Column D is a dependency.
+        ALWAYS direct — no depth, no recursion.
+
+    INDIRECT:
+        Start from (direct dependents ∪ direct dependencies).
+        For indirect_depth loops:
+            For each X in frontier:
+                add direct dependents(X)
+                add direct dependencies(X)
+
+    Each file is walked on its own, like the original per-workbook scan.
+    With annotate=True the result also has "annotations": {kind: {param: {"level", "via"}}},
+    the BFS level (hops from P) at which each returned parameter was first reached and its predecessor.
+    """
+    forward, reverse = get_relation_graph(file_paths) # adjacency per file
+
+    # Final output sets
+    dependent_set = set() # direct dependents
+    dependency_set = set() # direct dependencies
+    indirect_set = set() # indirect relations
+    reached = {"dependent": {}, "dependency": {}, "indirect": {}} # param -> (level, via), first hit wins
+
+    def note(kind, param, level, via): # keep the lowest level over all files
+        if annotate and (param not in reached[kind] or level < reached[kind][param][0]):
+            reached[kind][param] = (level, via)
+
+    for fwd, rev in zip(forward, reverse):
+        # 1️⃣ DIRECT DEPENDENT (forward), BFS using dependent_depth
+        direct_dependents = set(fwd.get(P, [])) # direct dependents set
+        visited = {P} # visited set
+        frontier = {P} # initial frontier
+        for level in range(1, dependent_depth + 1): # for each depth level
+            new_frontier = set() # next frontier
+            for param in (sorted(frontier) if annotate else frontier): # for each parameter in frontier (stable predecessors)
+                for dep in fwd.get(param, []): # related parameters
+                    if dep not in visited: # if not visited
+                        visited.add(dep) # mark visited
+                        dependent_set.add(dep) # add to dependent set
+                        new_frontier.add(dep) # add to new frontier
+                        note("dependent", dep, level, param)
+            if not new_frontier: # no more to explore
+                break
+            frontier = new_frontier # update frontier
+
+        # 2️⃣ DIRECT DEPENDENCY (backward NO DEPTH)
+        dependency_set.update(rev.get(P, [])) # rows whose Column P contains P
+        for dep in rev.get(P, []):
+            note("dependency", dep, 1, P)
+
+        # 3️⃣ INDIRECT = BFS using indirect_depth
+        start_points = direct_dependents | dependency_set # start from direct dependents and dependencies
+        visited_indirect = set(start_points) # visited set for indirect
+        frontier_indirect = set(start_points) # initial frontier for indirect
+        for level in range(2, indirect_depth + 2): # start points are one hop from P
+            next_frontier = set() # next frontier
+            for X in (sorted(frontier_indirect) if annotate else frontier_indirect): # for each parameter in frontier
+                for neighbour in fwd.get(X, []) + rev.get(X, []): # dependents and dependencies of X
+                    if neighbour not in visited_indirect: # if not visited
+                        visited_indirect.add(neighbour) # mark visited
+                        indirect_set.add(neighbour) # add to indirect set
+                        next_frontier.add(neighbour) # add to next frontier
+                        note("indirect", neighbour, level, X)
+            if not next_frontier: # no more to explore
+                break
+            frontier_indirect = next_frontier # update frontier
+
+    # Final cleanup
+    indirect_set -= dependent_set # remove direct dependents
+    indirect_set -= dependency_set # remove direct dependencies
+    indirect_set.discard(P) # remove P itself if present
+
+    result = {
+        "dependent": sorted(dependent_set), 
+        "dependency": sorted(dependency_set), 
+        "indirect": sorted(indirect_set) 
+    }
+    if annotate:
+        result["annotations"] = {kind: {param: {"level": reached[kind][param][0], "via": reached[kind][param][1]}
+                                        for param in result[kind]} for kind in reached}
+    return result
+
+
+def relation_neighbours(param, adjacencies):
+    """Neighbours of param over every file's adjacency (sorted, unique)"""
+    found = set()
+    for adjacency in adjacencies:
+        found.update(adjacency.get(param, []))
+    return sorted(found)
+
+
+def shortest_relation_path(source, target, file_paths, direction="any", max_depth=10):
+    """
+    Shortest chain of relations from source to target (bidirectional BFS over all files).
+    direction="forward" follows Column D -> Column P only; "any" also walks edges backwards, like the indirect search.
+    Returns a list of (param, relation) steps starting with (source, None), or None if no path within max_depth.
+    """
+    if source == target:
+        return [(source, None)]
+    forward, reverse = get_relation_graph(file_paths) # adjacency per file
+    steps_out = [("dependent", forward)] + ([("dependency", reverse)] if direction == "any" else []) # from the source side
+    steps_in = [("dependent", reverse)] + ([("dependency", forward)] if direction == "any" else []) # towards the target side
+
+    parents = {source: None} # node -> (previous node, relation) from the source side
+    children = {target: None} # node -> (next node, relation) towards the target
+    hops = {source: 0}, {target: 0} # distance from source / to target
+    frontier_out, frontier_in = [source], [target]
+    for _ in range(max_depth):
+        if not frontier_out or not frontier_in:
+            break
+        grow_out = len(frontier_out) <= len(frontier_in) # expand the smaller side
+        frontier = frontier_out if grow_out else frontier_in
+        seen, other = (parents, children) if grow_out else (children, parents)
+        seen_hops, other_hops = hops if grow_out else hops[::-1]
+        next_frontier, meetings = [], []
+        for node in frontier:
+            for relation, adjacencies in (steps_out if grow_out else steps_in):
+                for neighbour in relation_neighbours(node, adjacencies):
+                    if neighbour in seen:
                         continue
+                    seen[neighbour] = (node, relation)
+                    seen_hops[neighbour] = seen_hops[node] + 1
+                    next_frontier.append(neighbour)
+                    if neighbour in other:
+                        meetings.append(neighbour)
+        if meetings: # whole level done: pick the shortest join (then by name, for stable answers)
+            meet = min(meetings, key=lambda node: (other_hops[node], node))
+            path = [] # walk back to the source
+            node = meet
+            while node is not None:
+                link = parents[node]
+                path.append((node, link[1] if link else None))
+                node = link[0] if link else None
+            path.reverse()
+            node = meet # walk forward to the target
+            while children[node] is not None:
+                node, relation = children[node]
+                path.append((node, relation))
+            return path
+        if grow_out:
+            frontier_out = next_frontier
+        else:
+            frontier_in = next_frontier
+    return None
 
-                    if "bts" in mod_status:
-                        color = "red" # red for BTS
-                    elif "on-line" in mod_status:
-                        color = "green" # green for on-line
-                    elif "not modifiable" in mod_status:
-                        color = "gray" # gray for not modifiable
-                    else:
-                        color = "black" # default black
-
-                    if "mandatory" in required_col_ab:
-                        mand = "(M)" # mandatory
-                    elif "optional" in required_col_ab:
-                        mand = "(O)" # optional
-                    elif "system" in required_col_ab or "value set by" in required_col_ab:
-                        mand = "(S)" # system
-                    else:
-                        mand = "" # unknown
-
-                    uml_data[class_name]["attributes"].append({
-                        "name": abbreviation, # parameter name
-                        "type": data_type, # data type
-                        "mandatory": mand, # mandatory status
-                        "color": color, # color based on mod status
-                        "parent": parent # parent parameter
-                    }) # add attribute to class
-
-                    if "/" in class_name:
-                        parts = class_name.split("/") # split by '/'
-                        for i in range(1, len(parts)):
-                            parent_class = "/".join(parts[:i]) # parent class
-                            child_class = "/".join(parts[:i + 1]) # child class
-                            uml_data[parent_class]["relationships"].add(child_class) # add relationship
 
-                            multiplicity = "" # default multiplicity
-                            if min_occurs and min_occurs.lower() != 'nan' and max_occurs and max_occurs.lower() != 'nan': # both present
-                                multiplicity = f"{min_occurs}..{max_occurs}" # both
-                            elif min_occurs and min_occurs.lower() != 'nan': # only min present
-                                multiplicity = f"{min_occurs}..*" # min to many
-                            elif max_occurs and max_occurs.lower() != 'nan': # only max present
-                                multiplicity = f"0..{max_occurs}" # zero to max
+# --------- Impact matrix (NumPy CSR, all parameters at once) ---------
+impact_matrix_cache = {} # files_signature -> node table and per-file CSR matrices
+IMPACT_KINDS = ("dependent", "dependency", "indirect") # relation sets, as in compute_relation
 
-                            if multiplicity:
-                                uml_data[parent_class]["multiplicities"][child_class] = multiplicity # set multiplicity
 
-                    all_classes.add(class_name) # add to all classes set
+def csr_from_edges(rows, cols, n):
+    """CSR (indptr, indices) of an n x n 0/1 matrix; duplicate edges collapse"""
+    keys = np.unique(rows.astype(np.int64) * n + cols) # sorted by row, then column
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:]) # row boundaries
+    return indptr, (keys % n).astype(np.int64)
 
-        return sorted(all_classes) # return sorted list of all classes
+
+def get_impact_matrix(file_paths):
+    """
+    Relation edges of the report set as sparse matrices, built once per report set.
+    - nodes: sorted abbreviations (row / column labels)
+    - forward[f], reverse[f]: CSR of file f (reverse skips empty Column D, like get_relation_graph)
+    """
+    signature = files_signature(file_paths) # report set identity
+    matrix = impact_matrix_cache.get(signature)
+    if matrix is None:
+        edges = load_relation_edges(file_paths) # (file_index, src, dst)
+        nodes = sorted({src for _, src, _ in edges} | {dst for _, _, dst in edges}) # matrix labels
+        ids = {text: i for i, text in enumerate(nodes)}
+        n = len(nodes)
+        files = np.array([f for f, _, _ in edges], dtype=np.int64)
+        src = np.array([ids[s] for _, s, _ in edges], dtype=np.int64)
+        dst = np.array([ids[d] for _, _, d in edges], dtype=np.int64)
+        has_src = np.array([bool(s) for _, s, _ in edges], dtype=bool) # empty Column D is no dependency
+        forward, reverse = [], []
+        for f in range(len(file_paths)):
+            in_file = files == f
+            forward.append(csr_from_edges(src[in_file], dst[in_file], n))
+            back = in_file & has_src
+            reverse.append(csr_from_edges(dst[back], src[back], n))
+        matrix = {"nodes": nodes, "ids": ids, "forward": forward, "reverse": reverse}
+        impact_matrix_cache.clear() # keep only the current report set
+        impact_matrix_cache[signature] = matrix
+    return matrix
+
+
+def expand_pairs(keys, n, matrices):
+    """One propagation step: (source, node) pairs -> (source, neighbour) pairs over the given CSR matrices"""
+    sources, nodes = keys // n, keys % n
+    found = []
+    for indptr, indices in matrices:
+        starts = indptr[nodes] # first neighbour of each pair
+        counts = indptr[nodes + 1] - starts # neighbours per pair
+        total = int(counts.sum())
+        if not total:
+            continue
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) # position within each row
+        found.append(np.repeat(sources, counts) * n + indices[np.repeat(starts, counts) + offsets])
+    return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+
+def propagate_pairs(start, n, matrices, depth):
+    """Pairs first reached within depth steps from start (start pairs count as visited)"""
+    visited, frontier = start, start
+    reached = [] # new pairs of every level
+    for _ in range(depth):
+        frontier = np.setdiff1d(expand_pairs(frontier, n, matrices), visited, assume_unique=True) # unvisited only
+        if not frontier.size: # no more to explore
+            break
+        visited = np.union1d(visited, frontier)
+        reached.append(frontier)
+    return np.unique(np.concatenate(reached)) if reached else np.empty(0, dtype=np.int64)
+
+
+def compute_impact(file_paths, dependent_depth, indirect_depth):
+    """
+    compute_relation for every node at once, by frontier propagation over (source, node) pairs.
+    Returns the matrix and {kind: sorted pair keys}, where key = source * n + target.
+    """
+    matrix = get_impact_matrix(file_paths)
+    n = len(matrix["nodes"])
+    diagonal = np.arange(n, dtype=np.int64) * (n + 1) # (P, P) for every P
+    dependent = dependency = indirect = np.empty(0, dtype=np.int64)
+    for fwd, rev in zip(matrix["forward"], matrix["reverse"]): # each file on its own
+        dependent = np.union1d(dependent, propagate_pairs(diagonal, n, [fwd], dependent_depth)) # BFS, P visited
+        dependency = np.union1d(dependency, expand_pairs(diagonal, n, [rev])) # direct only, accumulates over files
+        start = np.union1d(expand_pairs(diagonal, n, [fwd]), dependency) # direct dependents + dependencies so far
+        indirect = np.union1d(indirect, propagate_pairs(start, n, [fwd, rev], indirect_depth))
+    indirect = np.setdiff1d(indirect, np.union1d(np.union1d(dependent, dependency), diagonal), assume_unique=True) # final cleanup
+    return matrix, {"dependent": dependent, "dependency": dependency, "indirect": indirect}
+
+
+def impact_relations(file_paths, dependent_depth, indirect_depth):
+    """{abbrev: {"dependent", "dependency", "indirect"}} for every node, same lists as compute_relation"""
+    matrix, pairs = compute_impact(file_paths, dependent_depth, indirect_depth)
+    nodes = matrix["nodes"]
+    n = len(nodes)
+    result = {node: {kind: [] for kind in IMPACT_KINDS} for node in nodes}
+    for kind, keys in pairs.items(): # keys are sorted by source, then target name
+        for source, target in zip((keys // n).tolist(), (keys % n).tolist()):
+            result[nodes[source]][kind].append(nodes[target])
+    return result
+
+
+def fan_counts(file_paths):
+    """Direct fan-in (dependencies) and fan-out (dependents) of every node"""
+    matrix, pairs = compute_impact(file_paths, 1, 0)
+    n = len(matrix["nodes"])
+    fan_out = np.bincount(pairs["dependent"] // n, minlength=n) # distinct direct dependents
+    fan_in = np.bincount(pairs["dependency"] // n, minlength=n) # distinct direct dependencies
+    return matrix["nodes"], fan_in, fan_out
+
+
+# --------- Relation result cache ---------
+relation_cache = OrderedDict() # (files_signature, parameter, dependent_depth, indirect_depth) -> result, LRU order
+relation_inflight = {} # key -> Future of the request computing it
+relation_cache_lock = threading.Lock() # guards the cache, in-flight table and counters
+relation_cache_stats = {"hits": 0, "misses": 0, "coalesced": 0, "generation": 0} # generation bumps on invalidation
+
+
+def clear_relation_cache():
+    """Drop cached relation results (model changed)"""
+    with relation_cache_lock:
+        relation_cache.clear()
+        relation_cache_stats["generation"] += 1 # results still being computed are not stored
+
+
+def cached_relation(key, compute):
+    """
+    Return compute() through the LRU cache.
+    Identical requests arriving while one is computing wait for its result instead of recomputing.
+    """
+    if app.config['RELATION_CACHE_SIZE'] <= 0:
+        return compute()
+    with relation_cache_lock:
+        if key in relation_cache: # hit
+            relation_cache.move_to_end(key) # most recently used
+            relation_cache_stats["hits"] += 1
+            return relation_cache[key]
+        pending = relation_inflight.get(key)
+        owner = pending is None # first request computes
+        if owner:
+            pending = relation_inflight[key] = Future()
+            relation_cache_stats["misses"] += 1
+            generation = relation_cache_stats["generation"]
+        else:
+            relation_cache_stats["coalesced"] += 1
+    if not owner:
+        return pending.result() # wait for the computing request (re-raises its error)
+
+    try:
+        result = compute()
     except Exception as e:
-        print(f"Error loading UML data: {e}") # log error
-        return []
+        with relation_cache_lock:
+            relation_inflight.pop(key, None)
+        pending.set_exception(e) # waiting requests fail the same way
+        raise
+    with relation_cache_lock:
+        relation_inflight.pop(key, None)
+        if generation == relation_cache_stats["generation"]: # model unchanged meanwhile
+            relation_cache[key] = result
+            while len(relation_cache) > app.config['RELATION_CACHE_SIZE']:
+                relation_cache.popitem(last=False) # evict least recently used
+    pending.set_result(result)
+    return result
+
+
+# --------- Shared read-only model snapshot (mmap) ---------
+SNAPSHOT_MAGIC = b"NIDDSNP2" # file signature (2: section offsets relative to the data start)
+SNAPSHOT_NONE = 0xFFFFFFFF # "no value" in u32 arrays
+model_snapshot = {"reader": None, "stamp": None} # attached snapshot and the file state it was read from
+
+
+def reset_model():
+    """Drop the loaded model (in-memory or snapshot views)"""
+    global parameters_list, parameter_relations, abbrev_to_param, param_to_abbrev, uml_data, class_hierarchy, uml_model_version
+    parameters_list = [] # reset parameters
+    parameter_relations = {} # reset relations
+    abbrev_to_param = {} # reset mappings
+    param_to_abbrev = {} # reset mappings
+    uml_data = new_uml_data() # reset UML data
+    class_hierarchy = {} # reset hierarchy index
+    uml_model_version += 1 # new (empty) model
+    uml_svg_cache.clear() # reset SVG layouts
+    clear_relation_cache() # reset relation results
+    model_snapshot.update(reader=None, stamp=None) # detach
+
+
+def write_model_snapshot(path, file_paths):
+    """
+    Serialize the loaded model into one flat, read-only file.
+    - string table: every string once, sorted by UTF-8 bytes, as offsets + data
+    - maps: sorted key ids + value ids; lists and trees: CSR (indptr + indices) arrays
+    - relation graph: forward/reverse CSR per file over string ids
+    All arrays are native u32, so readers can cast the mapped bytes without copying.
+    """
+    forward, reverse = get_relation_graph(file_paths) if file_paths else ([], []) # relation adjacency
+    hierarchy = class_hierarchy if len(class_hierarchy) == len(uml_data) else build_class_hierarchy(uml_data) # reuse when current
+
+    strings = set(parameters_list) | set(parameter_relations) | set(uml_data) # collect strings
+    for mapping in (abbrev_to_param, param_to_abbrev):
+        strings.update(mapping.keys())
+        strings.update(mapping.values())
+    for values in parameter_relations.values():
+        strings.update(values)
+    for info in uml_data.values():
+        for attr in info["attributes"]:
+            strings.update(v for v in (attr["name"], attr["type"], attr["mandatory"], attr["color"], attr["parent"]) if v is not None)
+        strings.update(info["relationships"])
+        strings.update(info["multiplicities"].values())
+    for adjacency in forward + reverse:
+        strings.update(adjacency.keys())
+        for values in adjacency.values():
+            strings.update(values)
+    table = sorted(strings, key=lambda text: text.encode('utf-8')) # byte order, so lookups can bisect
+    ids = {text: i for i, text in enumerate(table)} # string -> id
+    sid = lambda text: SNAPSHOT_NONE if text is None else ids[text] # id or NONE
+
+    sections = {} # name -> bytes
+    u32 = lambda values: array('I', values).tobytes() # native u32 array
+
+    def csr(name, rows): # rows of ids -> indptr + indices
+        indptr, indices = [0], []
+        for row in rows:
+            indices.extend(row)
+            indptr.append(len(indices))
+        sections[f"{name}_indptr"], sections[f"{name}_indices"] = u32(indptr), u32(indices)
+
+    encoded = [text.encode('utf-8') for text in table] # string data
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    sections["str_offsets"], sections["str_data"] = u32(offsets), b"".join(encoded)
+
+    sections["params"] = u32(ids[p] for p in parameters_list) # dropdown order
+    for name, mapping in (("a2p", abbrev_to_param), ("p2a", param_to_abbrev)):
+        keys = sorted(mapping, key=ids.get) # ascending ids
+        sections[f"{name}_keys"], sections[f"{name}_vals"] = u32(ids[k] for k in keys), u32(ids[mapping[k]] for k in keys)
+    rel_keys = sorted(parameter_relations, key=ids.get) # ascending ids
+    sections["rel_keys"] = u32(ids[k] for k in rel_keys)
+    csr("rel", ([ids[v] for v in parameter_relations[k]] for k in rel_keys))
+
+    classes = sorted(uml_data, key=ids.get) # ascending ids
+    position = {cls: i for i, cls in enumerate(classes)} # class -> index
+    sections["cls_keys"] = u32(ids[c] for c in classes)
+    sections["cls_order"] = u32(position[c] for c in uml_data) # original iteration order
+    csr("attr", ([component for attr in uml_data[c]["attributes"]
+                  for component in (sid(attr["name"]), sid(attr["type"]), sid(attr["mandatory"]), sid(attr["color"]), sid(attr["parent"]))]
+                 for c in classes)) # 5 ids per attribute
+    csr("child", ([ids[child] for child in hierarchy[c]["children"]] for c in classes)) # sorted child classes
+    sections["child_mult"] = u32(sid(uml_data[c]["multiplicities"].get(child)) for c in classes
+                                 for child in hierarchy[c]["children"]) # edge labels
+    sections["cls_parent"] = u32(position.get(hierarchy[c]["parent"], SNAPSHOT_NONE) for c in classes)
+    for field in ("depth", "attribute_count", "subtree_size", "subtree_attributes"):
+        sections[f"cls_{field}"] = u32(hierarchy[c][field] for c in classes)
+
+    for f, (fwd, rev) in enumerate(zip(forward, reverse)): # relation graph per file
+        csr(f"fwd{f}", ([ids[v] for v in fwd.get(text, [])] for text in table))
+        csr(f"rev{f}", ([ids[v] for v in rev.get(text, [])] for text in table))
+
+    directory = {} # name -> [offset from the data start, length]
+    offset = 0
+    for name, data in sections.items():
+        offset = (offset + 7) // 8 * 8 # 8-byte alignment
+        directory[name] = [offset, len(data)]
+        offset += len(data)
+    header = {"files": files_signature(file_paths) if file_paths else "", "graph_files": len(forward), "sections": directory}
+    header_bytes = json.dumps(header).encode('utf-8') # any size: sections start after it
+    data_start = snapshot_data_start(len(header_bytes))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp" # write aside, then swap atomically
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            for name, data in sections.items():
+                f.seek(data_start + directory[name][0]) # aligned start
+                f.write(data)
+        os.replace(tmp_path, path) # readers keep their old mapping until they reattach
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path) # no half-written files left behind
+        raise
+
+
+def snapshot_data_start(header_len):
+    """File offset of the first section: after magic, length and JSON directory, 8-byte aligned"""
+    return (len(SNAPSHOT_MAGIC) + 4 + header_len + 7) // 8 * 8
+
+
+class ModelSnapshot:
+    """Memory-mapped snapshot; arrays are memoryviews over the mapping (no copies)"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # shared page cache across workers
+        view = memoryview(self.mm)
+        if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError("Not a model snapshot")
+        try:
+            header_len = struct.unpack_from("<I", self.mm, len(SNAPSHOT_MAGIC))[0] # JSON directory size
+            start = len(SNAPSHOT_MAGIC) + 4
+            self.header = json.loads(bytes(view[start:start + header_len]))
+            base = snapshot_data_start(header_len) # section offsets are relative to this
+            self.sections = {name: view[base + offset:base + offset + length] for name, (offset, length) in self.header["sections"].items()}
+            self.str_offsets = self.u32("str_offsets") # string i = data[offsets[i]:offsets[i + 1]]
+            self.str_data = self.sections["str_data"]
+        except (struct.error, KeyError, TypeError) as e: # truncated or mangled directory
+            raise ValueError(f"Corrupt model snapshot: {e}")
+
+    def u32(self, name):
+        return self.sections[name].cast("I") # zero-copy u32 view
+
+    def string(self, i):
+        if i == SNAPSHOT_NONE:
+            return None
+        return bytes(self.str_data[self.str_offsets[i]:self.str_offsets[i + 1]]).decode('utf-8')
+
+    def string_id(self, text):
+        """Id of a string (binary search over the sorted table), -1 if absent"""
+        if not isinstance(text, str):
+            return -1
+        target = text.encode('utf-8')
+        low, high = 0, len(self.str_offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if bytes(self.str_data[self.str_offsets[mid]:self.str_offsets[mid + 1]]) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self.str_offsets) - 1 and self.string(low) == text:
+            return low
+        return -1
+
+    def strings(self, ids):
+        return [self.string(i) for i in ids]
+
+    def row(self, name, i):
+        """Row i of a CSR section"""
+        indptr = self.u32(f"{name}_indptr")
+        return self.u32(f"{name}_indices")[indptr[i]:indptr[i + 1]]
+
+    def relation_graph(self):
+        """Per-file (forward, reverse) adjacency views, same shape as get_relation_graph"""
+        files = range(self.header["graph_files"])
+        return [SnapshotAdjacency(self, f"fwd{f}") for f in files], [SnapshotAdjacency(self, f"rev{f}") for f in files]
+
+
+class SnapshotMapping(Mapping):
+    """Read-only dict view: sorted key ids + a value getter by position"""
+
+    def __init__(self, snapshot, keys, value, order=None):
+        self.snapshot = snapshot # owning snapshot
+        self.key_ids = snapshot.u32(keys) # ascending string ids
+        self.value = value # position -> value
+        self.order = snapshot.u32(order) if order else None # optional iteration order (positions)
+
+    def position(self, key):
+        i = self.snapshot.string_id(key) # string id
+        if i < 0:
+            return -1
+        pos = bisect_left(self.key_ids, i)
+        return pos if pos < len(self.key_ids) and self.key_ids[pos] == i else -1
+
+    def __getitem__(self, key):
+        pos = self.position(key)
+        if pos < 0:
+            raise KeyError(key)
+        return self.value(pos)
+
+    def __contains__(self, key):
+        return self.position(key) >= 0
+
+    def __iter__(self):
+        positions = self.order if self.order is not None else range(len(self.key_ids))
+        return (self.snapshot.string(self.key_ids[pos]) for pos in positions)
+
+    def __len__(self):
+        return len(self.key_ids)
+
+
+class SnapshotAdjacency:
+    """Relation adjacency of one file: abbrev -> list of abbrevs"""
+
+    def __init__(self, snapshot, name):
+        self.snapshot = snapshot # owning snapshot
+        self.name = name # CSR section prefix
+
+    def get(self, key, default=None):
+        i = self.snapshot.string_id(key) # row = string id
+        if i < 0:
+            return default
+        row = self.snapshot.row(self.name, i)
+        return self.snapshot.strings(row) if len(row) else default
+
+
+def attach_model_snapshot(path):
+    """Serve the model from a snapshot file: globals become read-only views over the mapping"""
+    global parameters_list, parameter_relations, abbrev_to_param, param_to_abbrev, uml_data, class_hierarchy, uml_model_version
+    snap = ModelSnapshot(path) # map the file
+    stat = os.stat(path)
+    value_of = lambda name: (lambda pos: snap.string(snap.u32(name)[pos])) # map value getter
+    cls_keys = snap.u32("cls_keys") # class string ids
+
+    def uml_entry(pos): # uml_data[cls] built on access
+        attrs = snap.row("attr", pos) # 5 ids per attribute
+        children = snap.strings(snap.row("child", pos)) # child classes
+        first_child = snap.u32("child_indptr")[pos] # index into child_mult
+        mults = snap.strings(snap.u32("child_mult")[first_child:first_child + len(children)]) # edge labels
+        return {
+            "attributes": [dict(zip(("name", "type", "mandatory", "color", "parent"), snap.strings(attrs[k:k + 5])))
+                           for k in range(0, len(attrs), 5)],
+            "relationships": set(children),
+            "multiplicities": {child: mult for child, mult in zip(children, mults) if mult is not None}
+        }
+
+    def hierarchy_entry(pos): # class_hierarchy[cls] built on access
+        parent = snap.u32("cls_parent")[pos]
+        return {
+            "parent": None if parent == SNAPSHOT_NONE else snap.string(cls_keys[parent]),
+            "children": snap.strings(snap.row("child", pos)),
+            "depth": snap.u32("cls_depth")[pos],
+            "attribute_count": snap.u32("cls_attribute_count")[pos],
+            "subtree_size": snap.u32("cls_subtree_size")[pos],
+            "subtree_attributes": snap.u32("cls_subtree_attributes")[pos]
+        }
+
+    parameters_list = snap.strings(snap.u32("params")) # JSON responses need a real list
+    abbrev_to_param = SnapshotMapping(snap, "a2p_keys", value_of("a2p_vals"))
+    param_to_abbrev = SnapshotMapping(snap, "p2a_keys", value_of("p2a_vals"))
+    parameter_relations = SnapshotMapping(snap, "rel_keys", lambda pos: snap.strings(snap.row("rel", pos)))
+    uml_data = SnapshotMapping(snap, "cls_keys", uml_entry, order="cls_order")
+    class_hierarchy = SnapshotMapping(snap, "cls_keys", hierarchy_entry, order="cls_order")
+    uml_model_version += 1 # new model for layout caches
+    uml_svg_cache.clear()
+    model_snapshot.update(reader=snap, stamp=(stat.st_ino, stat.st_mtime_ns, stat.st_size))
+
+
+def publish_model_snapshot(file_paths):
+    """After a load: write the shared snapshot and switch this worker to it too"""
+    path = app.config['MODEL_SNAPSHOT']
+    if not path:
+        return
+    try:
+        write_model_snapshot(path, file_paths)
+        attach_model_snapshot(path) # drop the private copy
+    except Exception as e: # the load itself succeeded: keep serving the private model
+        print(f"Failed to publish model snapshot: {e}") # log error
+
+
+@app.before_request # every worker follows the shared snapshot
+def sync_model_snapshot():
+    path = app.config['MODEL_SNAPSHOT']
+    if not path:
+        return
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        if model_snapshot["reader"] is not None: # cleared by another worker
+            reset_model()
+        return
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size) # file state
+    if model_snapshot["stamp"] != stamp: # new or replaced file
+        try:
+            attach_model_snapshot(path)
+        except (ValueError, OSError) as e: # stale format or unreadable: keep serving the private model
+            print(f"Ignoring model snapshot {path}: {e}") # log error
+            model_snapshot["stamp"] = stamp # don't retry this file on every request
+
+
+# --------- Admission control for heavy endpoints ---------
+class AdmissionGate:
+    """At most `limit` requests run at once; up to `queue` more wait, the rest are turned away immediately"""
+
+    def __init__(self, name, limit, queue, wait):
+        self.name = name # endpoint group
+        self.limit = limit # concurrent requests
+        self.queue = queue # waiting requests
+        self.wait = wait # seconds a waiting request may wait
+        self.slots = threading.BoundedSemaphore(limit) # running requests
+        self.lock = threading.Lock() # guards the counters
+        self.running = self.waiting = 0
+        self.rejected = self.timed_out = self.served = 0
+        self.avg_seconds = 1.0 # moving average request duration, for Retry-After
+
+    def retry_after(self):
+        """Seconds until a slot is likely free"""
+        return max(1, math.ceil(self.avg_seconds * (self.waiting + 1) / self.limit))
+
+    def enter(self):
+        """None when admitted, else the HTTP status to answer with (429 queue full, 503 waited too long)"""
+        if self.slots.acquire(blocking=False): # free slot: no queueing
+            with self.lock:
+                self.running += 1
+            return None
+        with self.lock:
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return 429
+            self.waiting += 1
+        admitted = self.slots.acquire(timeout=self.wait) # bounded wait
+        with self.lock:
+            self.waiting -= 1
+            if not admitted:
+                self.timed_out += 1
+                return 503
+            self.running += 1
+        return None
+
+    def leave(self, seconds):
+        with self.lock:
+            self.running -= 1
+            self.served += 1
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+        self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            return {"limit": self.limit, "queue": self.queue, "running": self.running, "waiting": self.waiting,
+                    "served": self.served, "rejected": self.rejected, "timed_out": self.timed_out,
+                    "avg_seconds": round(self.avg_seconds, 3)}
+
+
+admission_gates = {name: AdmissionGate(name, limit, app.config['ADMISSION_QUEUE'], app.config['ADMISSION_WAIT'])
+                   for name, limit in app.config['ADMISSION_LIMITS'].items()} # one gate per endpoint group
+
+
+def admission_limited(group):
+    """Route decorator: run the view only when the group's gate admits the request"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            max_length = app.config['MAX_CONTENT_LENGTH']
+            if max_length and (request.content_length or 0) > max_length: # refuse before queueing or reading the body
+                return request_too_large(None)
+            gate = admission_gates[group]
+            status = gate.enter()
+            if status is not None: # saturated: answer fast instead of piling up work
+                message = "Too many requests" if status == 429 else "Server busy"
+                return jsonify({"success": False, "error": f"{message}, please retry shortly"}), status, {"Retry-After": str(gate.retry_after())}
+            started = time.perf_counter()
+            try:
+                result = view(*args, **kwargs)
+            except BaseException:
+                gate.leave(time.perf_counter() - started)
+                raise
+            if isinstance(result, Response) and result.is_streamed and not result.direct_passthrough: # body is generated after the view returns (send_file bodies are ready)
+                result.call_on_close(lambda: gate.leave(time.perf_counter() - started)) # hold the slot until the stream ends
+            else:
+                gate.leave(time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorator
+
+
+@app.errorhandler(413) # request body above MAX_CONTENT_LENGTH
+def request_too_large(e):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return jsonify({"success": False, "error": f"Request too large (limit {limit_mb:.0f} MB)"}), 413
+
+
+@app.route('/admission-stats') # Concurrency gate counters
+def admission_stats():
+    return jsonify({name: gate.stats() for name, gate in admission_gates.items()})
 
 
 # ----------------- Routes: Parameter UI -----------------
@@ -298,6 +1965,9 @@ def parameter_page():
 @app.route('/get-parameters') # Get parameters route
 def get_parameters():  
     try:
+        if store_ready("parameter", session.get('uploaded_files', [])): # indexed store answers directly
+            return jsonify({"parameters": store_get_parameters()})
+
         # Return abbreviations (parameters_list)
         if not parameters_list:
             return jsonify({
@@ -311,28 +1981,14 @@ def get_parameters():
 
 @app.route('/get-relation', methods=['POST'])
 def get_relation():
-    """
-    DEPENDENT (forward):
-        Row where Column D == P → Column P contains dependent parameters.
-        Uses BFS with dependent_depth.
-
-    DEPENDENCY (backward):
-        Row where cleaned P contains P → Column D is a dependency.
-        ALWAYS direct — no depth, no recursion.
-
-    INDIRECT:
-        Start from (direct dependents ∪ direct dependencies).
-        For indirect_depth loops:
-            For each X in frontier:
-                add direct dependents(X)
-                add direct dependencies(X)
-    """
+    """Relations of one parameter for the session's files (see compute_relation)"""
     try:
         data = request.get_json() # get JSON data
 
         P = data.get("parameter", "").strip() # parameter to analyze
         dependent_depth = int(data.get("dependent_depth", 1)) # depth for dependents
         indirect_depth = int(data.get("indirect_depth", 1)) # depth for indirect
+        annotate = bool(data.get("annotate", False)) # add BFS level and predecessor per parameter
 
         if not P:
             return jsonify({"error": "No parameter provided"}), 400 # error if no parameter
@@ -341,128 +1997,138 @@ def get_relation():
         if not file_paths:
             return jsonify({"error": "No Excel files uploaded"}), 400 # error if no files
 
-        # Final output sets
-        dependent_set = set() # direct dependents
-        dependency_set = set() # direct dependencies
-        indirect_set = set() # indirect relations
-
-        # --- Column P cleaner ---(relates parameter column)
-        def extract_related(cell):
-            if pd.isna(cell):
-                return [] ## handle NaN
-            s = str(cell).strip()
-            if not s:
-                return [] # empty cell
-            items = [] # output list
-            for part in s.split(";"): # split by ';'
-                part = part.strip() # trim whitespace
-                if not part:
-                    continue
-                part = re.sub(r"::.*$", "", part)     # remove ::public etc.
-                if "-" in part:
-                    part = part.split("-")[-1].strip() # take part after last '-'
-                if part:
-                    items.append(part) # add to list
-            return items # return list of related parameters
-
-        # ---------------- PROCESS ALL FILES ----------------
-        for excel_path in file_paths:
-
-            df = pd.read_excel(excel_path, engine='openpyxl') # read Excel file
-            if df.shape[1] < 16:   # must have at least 16 columns
-                continue
+        key = (files_signature(file_paths), P, dependent_depth, indirect_depth, annotate) # same files and query -> same result
+        if store_ready("parameter", file_paths): # indexed store answers directly
+            return jsonify(cached_relation(key, lambda: store_get_relation(P, dependent_depth, indirect_depth, annotate)))
+
+        return jsonify(cached_relation(key, lambda: compute_relation(P, dependent_depth, indirect_depth, file_paths, annotate))) # return results
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500 # error handling
+
+
+
+@app.route('/impact-matrix') # Export all relations of the report set
+@admission_limited("analysis")
+def impact_matrix():
+    """
+    Every parameter's relation sets as one compressed file.
+    - format=npz (default): nodes + CSR indptr/indices per relation kind (numpy.load)
+    - format=csv: gzipped edge list source,target,relation
+    """
+    try:
+        file_paths = session.get('uploaded_files', []) # get uploaded files from session
+        if not file_paths:
+            return jsonify({"error": "No Excel files uploaded"}), 400 # error if no files
+
+        dependent_depth = int(request.args.get("dependent_depth", 1)) # depth for dependents
+        indirect_depth = int(request.args.get("indirect_depth", 1)) # depth for indirect
+        export_format = request.args.get("format", "npz")
+        if export_format not in ("npz", "csv"):
+            return jsonify({"error": "format must be npz or csv"}), 400
+
+        matrix, pairs = compute_impact(file_paths, dependent_depth, indirect_depth)
+        nodes = matrix["nodes"]
+        n = len(nodes)
+        buffer = BytesIO() # export file
+        if export_format == "npz":
+            arrays = {"nodes": np.array(nodes, dtype=str)} # row / column labels
+            for kind, keys in pairs.items():
+                arrays[f"{kind}_indptr"], arrays[f"{kind}_indices"] = csr_from_edges(keys // n, keys % n, n)
+            np.savez_compressed(buffer, **arrays)
+            mimetype = "application/octet-stream"
+        else:
+            import gzip # only needed for the CSV export
+            import csv
+            with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+                with TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+                    writer = csv.writer(text)
+                    writer.writerow(["source", "target", "relation"])
+                    for kind, keys in pairs.items():
+                        writer.writerows((nodes[s], nodes[t], kind) for s, t in zip((keys // n).tolist(), (keys % n).tolist()))
+            mimetype = "application/gzip"
+        buffer.seek(0)
+        filename = f"impact_{dependent_depth}_{indirect_depth}.{'npz' if export_format == 'npz' else 'csv.gz'}"
+        return send_file(buffer, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500 # error handling
+
+
+@app.route('/fan-counts') # Direct fan-in / fan-out per parameter
+@admission_limited("analysis")
+def get_fan_counts():
+    """fan_in = direct dependencies, fan_out = direct dependents (as in /get-relation); optional ?parameter=, ?sort=fan_in|fan_out, ?limit="""
+    try:
+        file_paths = session.get('uploaded_files', []) # get uploaded files from session
+        if not file_paths:
+            return jsonify({"error": "No Excel files uploaded"}), 400 # error if no files
+
+        nodes, fan_in, fan_out = fan_counts(file_paths)
+        rows = [{"parameter": node, "fan_in": int(i), "fan_out": int(o)} for node, i, o in zip(nodes, fan_in, fan_out) if node]
+        parameter = request.args.get("parameter", "").strip()
+        if parameter:
+            rows = [row for row in rows if row["parameter"] == parameter] or [{"parameter": parameter, "fan_in": 0, "fan_out": 0}]
+        sort = request.args.get("sort", "")
+        if sort in ("fan_in", "fan_out"):
+            rows.sort(key=lambda row: (-row[sort], row["parameter"])) # busiest first
+        limit = request.args.get("limit", type=int)
+        if limit:
+            rows = rows[:limit]
+        return jsonify({"parameters": rows, "count": len(rows)})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500 # error handling
 
-            col_D = df.columns[3] # Column D(abbreviation)
-            col_P = df.columns[15] # Column P(related list)
-
-            df["_P_clean"] = df[col_P].apply(extract_related) # pre-cleaned Column P
-
-            # =====================================================
-            # 1️⃣ DIRECT DEPENDENT (forward)
-            # =====================================================
-            direct_dependents = set() # direct dependents set
-            rows = df[df[col_D].astype(str).str.strip() == P][col_P] # rows where D == P(column abbreviation==related parameter)
-
-            for val in rows:
-                direct_dependents |= set(extract_related(val)) # add direct dependents
-
-            # BFS using dependent_depth
-            visited = {P} # visited set
-            frontier = {P} # initial frontier
-
-            for _ in range(dependent_depth): # for each depth level
-                new_frontier = set() # next frontier
-                for param in frontier: # for each parameter in frontier
-                    rows2 = df[df[col_D].astype(str).str.strip() == param][col_P] # find rows where D == param(column abbreviation==parameter)
-                    for v in rows2:
-                        for dep in extract_related(v):# extract related
-                            if dep not in visited: # if not visited
-                                visited.add(dep) # mark visited
-                                dependent_set.add(dep) # add to dependent set
-                                new_frontier.add(dep) # add to new frontier
-                if not new_frontier: # no more to explore
-                    break
-                frontier = new_frontier # update frontier
-
-            # 2️⃣ DIRECT DEPENDENCY (backward NO DEPTH)
-            rows2 = df[df["_P_clean"].apply(lambda arr: P in arr)][col_D] # rows where cleaned P contains P(related parameter)(column abbreviation)
-
-            for val in rows2: # for each value
-                cleaned = str(val).strip() # clean value
-                if cleaned: # if not empty
-                    dependency_set.add(cleaned) # add to dependency set
-
-            # 3️⃣ INDIRECT = BFS using indirect_depth
-            # =====================================================
-            start_points = direct_dependents | dependency_set # start from direct dependents and dependencies
-
-            visited_indirect = set(start_points) # visited set for indirect
-            frontier_indirect = set(start_points) # initial frontier for indirect
-
-            for _ in range(indirect_depth): # for each indirect depth level
-                next_frontier = set() # next frontier
-                for X in frontier_indirect: # for each parameter in frontier
-
-                    # dependents of X
-                    rowsX = df[df[col_D].astype(str).str.strip() == X][col_P] # rows where D == X(column abbreviation==parameter)
-                    for v in rowsX: # for each value
-                        for dep in extract_related(v): # extract related
-                            if dep not in visited_indirect: # if not visited
-                                visited_indirect.add(dep) # mark visited
-                                indirect_set.add(dep) # add to indirect set
-                                next_frontier.add(dep) # add to next frontier
-
-                    # dependencies of X
-                    rowsX2 = df[df["_P_clean"].apply(lambda arr: X in arr)][col_D] # rows where cleaned P contains X(related parameter)(column abbreviation)
-                    for v in rowsX2: # for each value
-                        cleaned = str(v).strip() # clean value
-                        if cleaned and cleaned not in visited_indirect: # if not visited
-                            visited_indirect.add(cleaned) # mark visited
-                            indirect_set.add(cleaned) # add to indirect set
-                            next_frontier.add(cleaned) # add to next frontier
-
-                if not next_frontier: # no more to explore
-                    break
-
-                frontier_indirect = next_frontier # update frontier
-
-        # Final cleanup
-        indirect_set -= dependent_set # remove direct dependents
-        indirect_set -= dependency_set # remove direct dependencies
-        indirect_set.discard(P) # remove P itself if present
 
+@app.route('/relation-path', methods=['POST']) # Why is X related to Y
+def relation_path():
+    """Shortest relation chain between two abbreviations: {source, target, direction: any|forward, max_depth}"""
+    try:
+        data = request.get_json() # get JSON data
+        source = data.get("source", "").strip() # start abbreviation
+        target = data.get("target", "").strip() # end abbreviation
+        direction = data.get("direction", "any") # any = like indirect, forward = dependents only
+        max_depth = int(data.get("max_depth", 10)) # longest chain searched
+
+        if not source or not target:
+            return jsonify({"error": "source and target are required"}), 400
+        if direction not in ("any", "forward"):
+            return jsonify({"error": "direction must be any or forward"}), 400
+
+        file_paths = session.get('uploaded_files', []) # get uploaded files from session
+        if not file_paths:
+            return jsonify({"error": "No Excel files uploaded"}), 400 # error if no files
+
+        path = shortest_relation_path(source, target, file_paths, direction, max_depth)
+        if path is None:
+            return jsonify({"found": False, "source": source, "target": target, "path": [], "steps": [], "length": None})
         return jsonify({
-            "dependent": sorted(dependent_set), 
-            "dependency": sorted(dependency_set), 
-            "indirect": sorted(indirect_set) 
-        }) # return results
+            "found": True,
+            "source": source,
+            "target": target,
+            "path": [node for node, _ in path], # abbreviations from source to target
+            "steps": [{"from": prev, "to": node, "relation": relation} # relation = what "to" is of "from"
+                      for (prev, _), (node, relation) in zip(path, path[1:])],
+            "length": len(path) - 1
+        })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500 # error handling
 
 
+@app.route('/relation-cache-stats') # Relation result cache counters
+def relation_cache_info():
+    with relation_cache_lock:
+        stats = {name: relation_cache_stats[name] for name in ("hits", "misses", "coalesced")}
+        stats.update(size=len(relation_cache), max_size=app.config['RELATION_CACHE_SIZE'], in_flight=len(relation_inflight))
+    lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+    stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0 # coalesced requests did not compute either
+    return jsonify(stats)
+
 
 @app.route('/reload-data', methods=['POST']) # Reload data route
+@admission_limited("upload")
 def reload_data(): # Reload parameter data from session files
     try:
         file_paths = session.get('uploaded_files', []) # get uploaded files from session
@@ -470,6 +2136,7 @@ def reload_data(): # Reload parameter data from session files
             return jsonify({"success": False, "error": "No files uploaded"}), 400 # error if no files
 
         load_excel_data(file_paths) # reload data
+        publish_model_snapshot(file_paths) # share with other workers
         return jsonify({ 
             "success": True, # success message
             "message": f"Data reloaded. Found {len(parameters_list)} abbreviations." 
@@ -498,6 +2165,7 @@ def uml_ui():
 
 
 @app.route('/upload-main', methods=['POST']) # Upload from main page
+@admission_limited("upload")
 def upload_main():
     """Handle file upload from main page and store in session"""
     try:
@@ -526,6 +2194,7 @@ def upload_main():
                 # Copy to global uploads folder for listing
                 global_path = os.path.join(app.config['UPLOAD_FOLDER'], filename) # global upload path
                 shutil.copy2(file_path, global_path) # copy to uploads folder
+                schedule_corpus_update([filename]) # keep the corpus index current
 
         # Process selected available files (copy to session)
         for filename in available_files:
@@ -547,9 +2216,11 @@ def upload_main():
         if diagram_type == 'uml': # UML diagram
             load_uml_data(file_paths) # Load UML data
             load_excel_data(file_paths)  # Also load parameter data with ALL files
+            publish_model_snapshot(file_paths) # share with other workers
             return jsonify({"success": True, "redirect": url_for('uml_ui')}) # redirect to UML page
         else:
             load_excel_data(file_paths) # Load parameter data
+            publish_model_snapshot(file_paths) # share with other workers
             return jsonify({"success": True, "redirect": url_for('parameter_page')}) # redirect to parameter page
 
     except Exception as e:
@@ -557,6 +2228,7 @@ def upload_main():
 
 
 @app.route('/select-available-files', methods=['POST']) # Select available files route
+@admission_limited("upload")
 def select_available_files(): 
     """Handle selection of available files without upload"""
     try:
@@ -594,6 +2266,7 @@ def select_available_files():
         if diagram_type == 'uml':
             load_uml_data(file_paths) # load UML data
             load_excel_data(file_paths) # also load parameter data with ALL files
+            publish_model_snapshot(file_paths) # share with other workers
             return jsonify({
                 "success": True,
                 "message": "Files loaded successfully.",
@@ -601,6 +2274,7 @@ def select_available_files():
             }) # redirect to UML page
         else:
             load_excel_data(file_paths) # load parameter data
+            publish_model_snapshot(file_paths) # share with other workers
             return jsonify({
                 "success": True,
                 "message": f"Files loaded successfully. Found {len(parameters_list)} abbreviations.",
@@ -612,6 +2286,7 @@ def select_available_files():
 
 # ----------------- Uploads to /uploads -----------------
 @app.route('/upload-to-folder', methods=['POST']) # Upload to uploads folder route
+@admission_limited("upload")
 def upload_to_folder():
     """Handle file uploads to the uploads folder from the plus button"""
     try:
@@ -624,16 +2299,20 @@ def upload_to_folder():
         os.makedirs(upload_folder, exist_ok=True) # ensure upload folder exists
 
         uploaded_count = 0 # count of uploaded files
+        saved_files = [] # filenames to reindex
         for file in uploaded_files: # process each file
             if file and file.filename.endswith(('.xlsx', '.xls', '.xlsm')): # check extension
                 filename = secure_filename(file.filename) # secure filename
                 file_path = os.path.join(upload_folder, filename) # file path
                 file.save(file_path) # save file
+                saved_files.append(filename) # reindex later
                 uploaded_count += 1 # increment count
 
         if uploaded_count == 0: # no valid files uploaded
             return jsonify({"success": False, "error": "No valid Excel files found"}), 400 # error if no valid files
 
+        schedule_corpus_update(saved_files) # index new/replaced files in the background
+
         return jsonify({
             "success": True,
             "message": f"{uploaded_count} file(s) uploaded successfully"
@@ -658,6 +2337,10 @@ def delete_all_files():
                 os.remove(file_path) # delete file
                 deleted_count += 1 # increment count
 
+        with corpus_lock:
+            remove_from_corpus_index(list(corpus_files)) # nothing left to search
+            corpus_terms.clear()
+
         return jsonify({
             "success": True,
             "message": f"{deleted_count} file(s) deleted successfully"
@@ -687,6 +2370,9 @@ def delete_file():
             return jsonify({"success": False, "error": "Invalid file type"}), 400 # validate file type
 
         os.remove(file_path) # delete file
+        with corpus_lock:
+            remove_from_corpus_index([safe_filename]) # drop its hits
+            corpus_terms[:] = sorted(corpus_index) # refresh prefix list
 
         return jsonify({
             "success": True,
@@ -697,6 +2383,275 @@ def delete_file():
         return jsonify({"success": False, "error": str(e)}), 500 # error handling
 
 
+# ----------------- Corpus-wide search index -----------------
+def index_workbook(file_path, df_sheets=None):
+    """
+    Collect search hits for one workbook (cached as the "hits" rows of get_parsed_file).
+    - Column B -> MOC name, Column C -> full parameter name, Column D -> abbreviation
+    - row is the 1-based Excel row number
+    """
+    hits = [] # output list
+    filename = os.path.basename(file_path) # file shown to users
+    if df_sheets is None:
+        df_sheets = pd.read_excel(file_path, sheet_name=None, engine='openpyxl', header=None) # raw rows, keep row numbers
+    for sheet_name, df in df_sheets.items():
+        if df.shape[1] < 16: # same rule as load_excel_data
+            continue
+        header_row = detect_header(df, search_columns=["Parameter", "Parameter Name", "Abbreviation", "Relation", "Related"]) # detect header
+        seen_mocs = set() # one MOC hit per sheet (its first row)
+        for row_index in range(header_row + 1, len(df)): # data rows only
+            moc, full_name, abbrev = (df.iat[row_index, col] for col in (1, 2, 3)) # columns B, C, D
+            moc = str(moc).strip() if pd.notna(moc) else "" # MOC name
+            cells = [("abbreviation", abbrev), ("parameter", full_name)] # per-row terms
+            if moc not in seen_mocs:
+                seen_mocs.add(moc)
+                cells.append(("moc", moc)) # first row of this MOC
+            for kind, value in cells:
+                value = str(value).strip() if pd.notna(value) else "" # cell text
+                if value and value.lower() not in ['nan', 'none']:
+                    hits.append({"file": filename, "sheet": sheet_name, "row": row_index + 1,
+                                 "kind": kind, "value": value, "moc": moc}) # one hit per cell
+    return hits
+
+
+def remove_from_corpus_index(filenames):
+    """Drop every hit of the given files (caller holds corpus_lock)"""
+    for filename in filenames:
+        entry = corpus_files.pop(filename, None) # indexed hits of this file
+        if not entry:
+            continue
+        for term in {hit["value"].lower() for hit in entry["hits"]}: # terms this file contributed
+            remaining = [hit for hit in corpus_index.get(term, []) if hit["file"] != filename] # keep other files
+            if remaining:
+                corpus_index[term] = remaining
+            else:
+                corpus_index.pop(term, None) # term no longer present
+
+
+def update_corpus_index(filenames=None):
+    """
+    Bring the index in line with uploads/.
+    - filenames=None rescans the whole folder (new, changed and deleted files)
+    - otherwise only the given files are (re)indexed or dropped
+    """
+    upload_folder = app.config['UPLOAD_FOLDER'] # uploads folder
+    if filenames is None:
+        filenames = [f for f in os.listdir(upload_folder) if f.lower().endswith(('.xls', '.xlsx', '.xlsm'))] # all workbooks
+        with corpus_lock:
+            filenames += [f for f in corpus_files if f not in filenames] # deleted since last scan
+
+    for filename in filenames:
+        file_path = os.path.join(upload_folder, filename) # full path
+        if not os.path.isfile(file_path): # deleted
+            with corpus_lock:
+                remove_from_corpus_index([filename])
+            continue
+        key = file_cache_key(file_path) # change detection, same key as the parsed workbook cache
+        with corpus_lock:
+            entry = corpus_files.get(filename)
+            if entry and (entry["size"], entry["mtime_ns"]) == key[1:]: # unchanged
+                continue
+            if filename in corpus_pending or key in watcher_state["pending"]: # another job indexes it (pre-parsing reschedules it)
+                continue
+            corpus_pending.add(filename)
+        try:
+            try:
+                hits = get_parsed_file(file_path, "hits", keep=False) # pre-parsed rows when warm, parse outside the lock
+            except Exception as e:
+                print(f"Error indexing {filename}: {e}") # log error
+                hits = []
+            with corpus_lock:
+                remove_from_corpus_index([filename]) # drop the old version
+                corpus_files[filename] = {"size": key[1], "mtime_ns": key[2], "hits": hits}
+                for hit in hits:
+                    corpus_index.setdefault(hit["value"].lower(), []).append(hit) # term -> hits
+        finally:
+            with corpus_lock:
+                corpus_pending.discard(filename) # job done
+
+    with corpus_lock:
+        corpus_terms[:] = sorted(corpus_index) # refresh prefix list
+
+
+def schedule_corpus_update(filenames=None):
+    """Run update_corpus_index in a background thread"""
+    def worker():
+        try:
+            update_corpus_index(filenames)
+        finally:
+            if filenames is None:
+                corpus_state["building"] = False # full scan finished
+                corpus_state["built"] = True
+    if filenames is None:
+        if corpus_state["building"]: # a full scan is already running
+            return
+        corpus_state.update(building=True, scanned=time.time())
+    threading.Thread(target=worker, daemon=True).start() # do not block the request
+
+
+def ensure_corpus_index():
+    """Start the initial full scan once; without the uploads watcher, rescan at most every WATCH_INTERVAL"""
+    stale = not watcher_state["started"] and time.time() - corpus_state["scanned"] >= app.config['WATCH_INTERVAL'] # another process watches
+    if not corpus_state["building"] and (not corpus_state["built"] or stale):
+        schedule_corpus_update()
+
+
+@app.route('/search-corpus') # Look up which report defines a parameter or MOC
+def search_corpus():
+    """
+    Query string:
+    - q: abbreviation, full parameter name or MOC name (case-insensitive)
+    - kind: optional filter (abbreviation / parameter / moc)
+    - prefix: 1 to match every term starting with q
+    """
+    try:
+        query = request.args.get('q', '').strip().lower() # search term
+        kind = request.args.get('kind', '') # optional kind filter
+        prefix = request.args.get('prefix', '0') == '1' # prefix match
+        limit = int(request.args.get('limit', 200)) # cap on returned hits
+
+        ensure_corpus_index() # first use starts the scan
+        if not query:
+            return jsonify({"success": False, "error": "No search term provided", "results": []}), 400 # error if no term
+
+        results = [] # output list
+        with corpus_lock:
+            if prefix:
+                start = bisect_left(corpus_terms, query) # first candidate term
+                for term in corpus_terms[start:]:
+                    if not term.startswith(query) or len(results) >= limit:
+                        break
+                    results.extend(hit for hit in corpus_index.get(term, []) if not kind or hit["kind"] == kind) # kind filter before counting
+            else:
+                results = [hit for hit in corpus_index.get(query, []) if not kind or hit["kind"] == kind] # exact term, kind filter
+
+        return jsonify({
+            "success": True,
+            "results": results[:limit],
+            "indexing": corpus_state["building"] # results may still be incomplete
+        }) # return hits
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "results": []}), 500 # error handling
+
+
+# ----------------- Report version diff -----------------
+REPORT_ROW_FIELDS = ("type", "mandatory", "color", "parent", "multiplicity", "full_name", "related") # compared per (MOC, abbreviation)
+report_diff_cache = OrderedDict() # (file_cache_key(old), file_cache_key(new)) -> diff, most recent last
+
+
+def report_rows(file_path):
+    """
+    Normalized rows of one workbook from the parsed-file cache: {(MOC, abbreviation): (row tuple, hash)}.
+    UML rows give the MOC and attribute columns, parameter rows add the full name and related abbreviations.
+    """
+    parameters = {} # abbrev -> (full name, related)
+    for abbrev, full_name, rels in get_parsed_file(file_path, "parameters"):
+        old_name, old_rels = parameters.get(abbrev, ("", ()))
+        parameters[abbrev] = (full_name or old_name, tuple(sorted(set(old_rels) | set(rels)))) # merged like load_excel_data
+    rows = {}
+    for class_name, attr, multiplicity in get_parsed_file(file_path, "uml"):
+        full_name, rels = parameters.get(attr["name"], ("", ()))
+        row = (attr["type"], attr["mandatory"], attr["color"], attr["parent"] or "", multiplicity, full_name, ";".join(rels))
+        digest = hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=8).digest() # compact row fingerprint
+        rows[(class_name, attr["name"])] = (row, digest) # last row wins, like a re-declared parameter
+    return rows
+
+
+def class_tree(class_names):
+    """Every class path with its prefixes, and the (parent, child) tree edges, as load_uml_data builds them"""
+    classes, edges = set(), set()
+    for class_name in class_names:
+        parts = class_name.split("/")
+        prefixes = ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+        classes.update(prefixes)
+        edges.update(zip(prefixes, prefixes[1:]))
+    return classes, edges
+
+
+def diff_reports(old_path, new_path):
+    """
+    Compare two workbook revisions in linear time (hash maps and set differences):
+    - parameters added / removed / changed, keyed by (MOC, abbreviation); changed rows list their changed fields
+    - relation edges (Column D -> Column P) added / removed
+    - classes added / removed / changed (own attributes differ) and tree edges added / removed
+    """
+    key = (file_cache_key(old_path), file_cache_key(new_path))
+    if key in report_diff_cache:
+        report_diff_cache.move_to_end(key)
+        return report_diff_cache[key]
+
+    old_rows, new_rows = report_rows(old_path), report_rows(new_path)
+    added = sorted(new_rows.keys() - old_rows.keys())
+    removed = sorted(old_rows.keys() - new_rows.keys())
+    changed = sorted(k for k in old_rows.keys() & new_rows.keys() if old_rows[k][1] != new_rows[k][1]) # hash mismatch only
+
+    old_edges, new_edges = set(get_parsed_file(old_path, "edges")), set(get_parsed_file(new_path, "edges"))
+    old_classes, old_tree = class_tree(moc for moc, _ in old_rows)
+    new_classes, new_tree = class_tree(moc for moc, _ in new_rows)
+    touched = {moc for moc, _ in added} | {moc for moc, _ in removed} | {moc for moc, _ in changed} # classes with attribute changes
+
+    param = lambda k: {"moc": k[0], "abbreviation": k[1]}
+    diff = {
+        "parameters": {
+            "added": [param(k) for k in added],
+            "removed": [param(k) for k in removed],
+            "changed": [{**param(k), "fields": {field: [old, new] for field, old, new in zip(REPORT_ROW_FIELDS, old_rows[k][0], new_rows[k][0]) if old != new}}
+                        for k in changed]
+        },
+        "relations": {
+            "added": [list(edge) for edge in sorted(new_edges - old_edges)],
+            "removed": [list(edge) for edge in sorted(old_edges - new_edges)]
+        },
+        "classes": {
+            "added": sorted(new_classes - old_classes),
+            "removed": sorted(old_classes - new_classes),
+            "changed": sorted((touched & old_classes & new_classes)),
+            "edges_added": [list(edge) for edge in sorted(new_tree - old_tree)],
+            "edges_removed": [list(edge) for edge in sorted(old_tree - new_tree)]
+        }
+    }
+    diff["summary"] = {f"{group}_{kind}": len(items) for group in ("parameters", "relations", "classes")
+                       for kind, items in diff[group].items() if not kind.startswith("edges")}
+    report_diff_cache[key] = diff
+    while len(report_diff_cache) > 8: # a few recent comparisons
+        report_diff_cache.popitem(last=False)
+    return diff
+
+
+def resolve_report(name):
+    """Path of a workbook by file name: the session's files first, then uploads/"""
+    for path in session.get('uploaded_files', []):
+        if os.path.basename(path) == name:
+            return path
+    path = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(name))
+    return path if name and os.path.exists(path) else None
+
+
+def mermaid_diff_lines(classes_info, diff):
+    """Mermaid style lines marking added / changed classes of a diff (node lines stay as they are)"""
+    lines = [f"classDef {status} fill:{fill},stroke:{stroke},stroke-width:2px" for status, (fill, stroke) in DIFF_STYLES.items()]
+    for status in ("added", "changed"):
+        ids = [create_safe_node_id(cls) for cls in diff["classes"][status] if cls in classes_info]
+        if ids:
+            lines.append(f"class {','.join(ids)} {status}")
+    return lines
+
+
+@app.route('/diff-reports', methods=['POST']) # Compare two revisions of a report
+@admission_limited("analysis")
+def diff_reports_route():
+    """{"old": file name, "new": file name} (session files or uploads/) -> added / removed / changed parameters, relations, classes"""
+    try:
+        data = request.get_json() # get JSON data
+        old_path, new_path = resolve_report(data.get("old", "")), resolve_report(data.get("new", ""))
+        if not old_path or not new_path:
+            return jsonify({"success": False, "error": "Both 'old' and 'new' must name an uploaded workbook"}), 400
+        return jsonify({"success": True, "old": os.path.basename(old_path), "new": os.path.basename(new_path),
+                        **diff_reports(old_path, new_path)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500 # error handling
+
+
 # ----------------- UML class loading for UI -----------------
 @app.route('/upload', methods=['POST']) # Upload UML classes route
 def upload_file(): 
@@ -710,142 +2665,161 @@ def upload_file():
             "error": "No files found in session. Please upload files from the main page."
         }), 400 # error if no files
 
+    if not uml_data and store_ready("uml", file_paths): # model already in the store (e.g. after restart)
+        classes_with_all = [{"value": "All Classes", "label": "All Classes"}] + store_get_classes() # prepend All Classes
+        return jsonify({"success": True, "classes": classes_with_all}) # return classes
+
     # If UML data not already loaded, load it
     if not uml_data:
         classes = load_uml_data(file_paths) # load UML data
-        classes_data = [{"value": cls, "label": cls.split("/")[-1]} for cls in classes] # prepare class data
+        publish_model_snapshot(file_paths) # share with other workers
+        classes_data = class_dropdown_entries(classes) # prepare class data with summary numbers
         classes_with_all = [{"value": "All Classes", "label": "All Classes"}] + classes_data # prepend All Classes
         return jsonify({"success": True, "classes": classes_with_all}) # return classes
 
     else:
         all_classes = sorted(uml_data.keys()) # get all class names
-        classes_data = [{"value": cls, "label": cls.split("/")[-1]} for cls in all_classes] # prepare class data
+        classes_data = class_dropdown_entries(all_classes) # prepare class data with summary numbers
         classes_with_all = [{"value": "All Classes", "label": "All Classes"}] + classes_data # prepend All Classes
         return jsonify({"success": True, "classes": classes_with_all}) # return classes
 
 
 # ----------------- UML Diagram Generation -----------------
 @app.route('/uml', methods=['POST']) # UML generation route
+@admission_limited("uml")
 def generate_uml():
     data = request.get_json() # get JSON data
     selected_class = data.get("parameter") # selected class
     depth = int(data.get("depth", 1)) # depth for relationships
+    view = data.get("view", "subtree") # "subtree" (default) or "ancestors"
+    max_classes = data.get("max_classes") # optional cap on subtree size
+    max_classes = int(max_classes) if max_classes else None # None means no cap
+
+    render = data.get("render", "mermaid") # "mermaid" (default) or "svg" (server-side layout)
+    stream = data.get("stream") # "text" or "ndjson": stream "All Classes" Mermaid instead of one JSON body
+    highlight = data.get("highlight_diff") # optional {"old", "new"}: mark classes added / changed between two revisions
 
     if not selected_class:
         return jsonify({"uml": "graph TD\n%% No class selected", "class_count": 0}) # no class selected
 
-    if selected_class == "All Classes": # generate UML for all classes
-        return generate_all_classes_uml() # Generate UML for all classes
-
-    if selected_class not in uml_data: 
-        return jsonify({"uml": "graph TD\n%% Invalid class selected", "class_count": 0}) # invalid class
-
-    visited = set() # visited classes
-    result_classes = {} # classes to include in UML
-    queue = deque() # BFS queue
-    queue.append((selected_class, 0)) # (class, current_depth)
-
-    while queue:
-        current_cls, current_depth = queue.popleft() # dequeue
-        if current_cls in visited or current_depth > depth: 
-            continue
-
-        visited.add(current_cls) # mark visited
-        result_classes[current_cls] = uml_data[current_cls] # add class info
+    diff = diff_key = None
+    if highlight:
+        old_path, new_path = resolve_report(highlight.get("old", "")), resolve_report(highlight.get("new", ""))
+        if not old_path or not new_path:
+            return jsonify({"uml": "graph TD\n%% Unknown report for highlight_diff", "class_count": 0})
+        diff = diff_reports(old_path, new_path) # cached per revision pair
+        diff_key = (file_cache_key(old_path), file_cache_key(new_path)) # identifies the highlight in layout caches
 
-        if current_depth < depth: # only explore further if within depth
-            for rel in uml_data[current_cls]["relationships"]: # for each related class
-                queue.append((rel, current_depth + 1))# enqueue related classes
+    if not uml_data and (render == "svg" or stream in ("text", "ndjson")) and store_ready("uml", session.get('uploaded_files', [])):
+        load_uml_from_store() # layouts and streams walk the in-memory model
 
-    lines = ["graph TD"] # start graph
+    if render == "svg": # positioned SVG, laid out and cached on the server
+        return generate_uml_svg(selected_class, depth, view, max_classes, diff, diff_key)
 
-    for cls, info in result_classes.items(): # for each class
-        safe_cls = create_safe_node_id(cls) # safe node ID
-        display_name = sanitize_for_mermaid(cls.split("/")[-1]) # display name
-        
-        # Center-aligned class name
-        label_lines = [f"<div style='text-align:center;'><b>{display_name}</b></div>", "<hr>"] # center-aligned class name
+    if not uml_data and store_ready("uml", session.get('uploaded_files', [])): # indexed store answers directly
+        result_classes = store_get_uml_classes(selected_class, depth, view, max_classes) # selected classes only
+        if not result_classes:
+            return jsonify({"uml": "graph TD\n%% Invalid class selected", "class_count": 0}) # invalid class
+        lines = mermaid_lines(result_classes) + (mermaid_diff_lines(result_classes, diff) if diff else []) # styles only, nodes unchanged
+        return jsonify({"uml": "\n".join(lines), "class_count": len(result_classes)})
 
-        attributes = info["attributes"] # all attributes
-        visible_attrs = attributes[:MAX_VISIBLE_ATTRIBUTES] # visible attributes
-        hidden_count = len(attributes) - MAX_VISIBLE_ATTRIBUTES # count of hidden attributes
+    if selected_class == "All Classes": # generate UML for all classes
+        if stream in ("text", "ndjson"):
+            return stream_all_classes_uml(stream, diff) # chunked response, bounded memory
+        return generate_all_classes_uml(diff) # Generate UML for all classes
 
-        # Left-aligned attributes with padding
-        for attr in visible_attrs:
-            attr_name = sanitize_for_mermaid(attr['name']) # add attribute line
-            attr_type = sanitize_for_mermaid(attr['type'])  # add attribute line
-            attr_mand = sanitize_for_mermaid(attr['mandatory']) # add attribute line
-            if not attr_name or attr_name == 'nan': 
-                continue # skip invalid
-            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:{attr['color']}'>+ {attr_name} : {attr_type} {attr_mand}</span></div>") # add attribute line
+    if selected_class not in uml_data: 
+        return jsonify({"uml": "graph TD\n%% Invalid class selected", "class_count": 0}) # invalid class
 
-        if hidden_count > 0:# indicate more
-            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:#3b82f6;font-weight:600;font-style:italic'>... +{hidden_count} more attributes</span></div>") # indicate more
+    selected = select_uml_classes(selected_class, depth, view, max_classes) # classes to draw
 
-        html_label = "<br>".join(label_lines).replace('"', '#quot;') # sanitize quotes
-        lines.append(f'{safe_cls}["{html_label}"]') # add class node
+    result_classes = {cls: uml_data[cls] for cls in selected if cls in uml_data} # classes to include in UML
 
-    for cls, info in result_classes.items(): # for each class
-        from_cls = create_safe_node_id(cls) # source class
-        for rel in info["relationships"]:# for each relationship
-            if rel in result_classes:
-                to_cls = create_safe_node_id(rel) # target class
-                multiplicity = info["multiplicities"].get(rel, "") # get multiplicity
-                if multiplicity:
-                    multiplicity = sanitize_for_mermaid(multiplicity) # sanitize multiplicity
-                    lines.append(f'{from_cls} -->|{multiplicity}| {to_cls}') # add relationship with multiplicity
-                else:
-                    lines.append(f"{from_cls} --> {to_cls}") # add relationship
+    lines = mermaid_lines(result_classes) # Mermaid source for the selected classes
+    if diff:
+        lines += mermaid_diff_lines(result_classes, diff) # styles only, nodes unchanged
 
     return jsonify({"uml": "\n".join(lines), "class_count": len(result_classes)}) # return class count
 
-def generate_all_classes_uml(): # Generate UML for all classes
+def generate_all_classes_uml(diff=None): # Generate UML for all classes
     if not uml_data:
         return jsonify({"uml": "graph TD\n%% No classes available", "class_count": 0}) # no data
 
-    lines = ["graph TD"] # start graph
-
-    for cls, info in uml_data.items(): # for each class
-        safe_cls = create_safe_node_id(cls) # safe node ID
-        display_name = sanitize_for_mermaid(cls.split("/")[-1]) # display name
-        
-        # Center-aligned class name
-        label_lines = [f"<div style='text-align:center;'><b>{display_name}</b></div>", "<hr>"] # center-aligned class name
-
-        attributes = info["attributes"] # all attributes
-        visible_attrs = attributes[:MAX_VISIBLE_ATTRIBUTES] # visible attributes
-        hidden_count = len(attributes) - MAX_VISIBLE_ATTRIBUTES # count of hidden attributes
-
-        # Left-aligned attributes with padding
-        for attr in visible_attrs:
-            attr_name = sanitize_for_mermaid(attr['name']) # add attribute line
-            attr_type = sanitize_for_mermaid(attr['type']) # add attribute line
-            attr_mand = sanitize_for_mermaid(attr['mandatory']) # add attribute line
-            if not attr_name or attr_name == 'nan': # skip invalid
-                continue
-            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:{attr['color']}'>+ {attr_name} : {attr_type} {attr_mand}</span></div>") # add attribute line
+    lines = mermaid_lines(uml_data) # Mermaid source for every class
+    if diff:
+        lines += mermaid_diff_lines(uml_data, diff) # highlight added / changed classes
 
-        if hidden_count > 0: # indicate more
-            label_lines.append(f"<div style='text-align:left;padding-left:8px;'><span style='color:#3b82f6;font-weight:600;font-style:italic'>... +{hidden_count} more attributes</span></div>") # indicate more
+    return jsonify({"uml": "\n".join(lines), "class_count": len(uml_data)}) # return total classes
 
-        html_label = "<br>".join(label_lines).replace('"', '#quot;') # sanitize quotes
-        lines.append(f'{safe_cls}["{html_label}"]') # add class node
+UML_STREAM_CHUNK = 200 # Mermaid lines per streamed chunk
 
-    for cls, info in uml_data.items():
-        from_cls = create_safe_node_id(cls) # source class
-        for rel in info["relationships"]: # for each relationship
-            if rel in uml_data:
-                to_cls = create_safe_node_id(rel) # target class
-                multiplicity = info["multiplicities"].get(rel, "") # get multiplicity
-                if multiplicity:
-                    multiplicity = sanitize_for_mermaid(multiplicity) # sanitize multiplicity
-                    lines.append(f'{from_cls} -->|{multiplicity}| {to_cls}') # add relationship with multiplicity
-                else:
-                    lines.append(f"{from_cls} --> {to_cls}") # add relationship
 
-    return jsonify({"uml": "\n".join(lines), "class_count": len(uml_data)}) # return total classes
+def stream_all_classes_uml(stream, diff=None):
+    """
+    Stream the "All Classes" Mermaid source while it is generated.
+    - text: plain Mermaid lines (class count in the X-Class-Count header)
+    - ndjson: {"type": "meta"} first, then one {"type": "node"|"edge"|"style", "line"} object per line, {"type": "end"} last
+    With a report diff, "style" lines marking added / changed classes follow the edges.
+    """
+    classes = uml_data # loaders rebind uml_data, so this model stays intact while streaming
+
+    def generate():
+        if stream == "ndjson":
+            yield json.dumps({"type": "meta", "class_count": len(classes)}) + "\n"
+        if not classes:
+            yield "graph TD\n%% No classes available\n" if stream == "text" else json.dumps({"type": "end", "lines": 0}) + "\n"
+            return
+        chunk, count = [], 0 # pending lines, lines sent
+        styles = (("style", line) for line in (mermaid_diff_lines(classes, diff) if diff else [])) # highlight lines last
+        for kind, line in chain(mermaid_fragments(classes), styles):
+            chunk.append(line + "\n" if stream == "text" else json.dumps({"type": kind, "line": line}) + "\n")
+            count += 1
+            if len(chunk) >= UML_STREAM_CHUNK: # flush a chunk
+                yield "".join(chunk)
+                chunk = []
+        if stream == "ndjson":
+            chunk.append(json.dumps({"type": "end", "lines": count}) + "\n")
+        yield "".join(chunk)
+
+    mimetype = "application/x-ndjson" if stream == "ndjson" else "text/plain"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={"X-Class-Count": str(len(classes))})
+
+def generate_uml_svg(selected_class, depth, view, max_classes, diff=None, diff_key=None): # Server-side rendered diagram
+    version = uml_model_version # read first: a load swaps the model in before bumping the version
+    if not uml_data:
+        return jsonify({"svg": "", "class_count": 0, "error": "No classes available"}) # no data
+    if selected_class != "All Classes" and selected_class not in uml_data:
+        return jsonify({"svg": "", "class_count": 0, "error": "Invalid class selected"}) # invalid class
+
+    if selected_class == "All Classes":
+        depth, view, max_classes = 0, "all", None # options do not apply
+    elif view == "ancestors":
+        depth, max_classes = 0, None # options do not apply
+    else: # equivalent requests share one cache entry
+        depth = min(max(depth, 0), class_tree_height()) # deeper than the tree draws the same subtree
+        if max_classes is not None:
+            max_classes = max(max_classes, 1)
+            if max_classes >= class_hierarchy[selected_class]["subtree_size"]:
+                max_classes = None # cap above the subtree size draws the same subtree
+    key = (version, selected_class, depth, view, max_classes, diff_key) # cache key
+    entry = uml_svg_cache.get(key) # already laid out?
+    cached = entry is not None
+    if cached:
+        try:
+            uml_svg_cache.move_to_end(key) # most recently used
+        except KeyError: # cleared by a concurrent load
+            pass
+    else:
+        classes = select_uml_classes(selected_class, depth, view, max_classes) # classes to draw
+        highlight = {cls: status for status in DIFF_STYLES for cls in diff["classes"][status]} if diff else None # diff colours
+        entry = uml_svg_cache[key] = (render_class_tree_svg(classes, highlight), len(classes)) # layout once
+        while len(uml_svg_cache) > app.config['SVG_CACHE_SIZE']:
+            uml_svg_cache.popitem(last=False) # evict least recently used
+    svg, class_count = entry
+    return jsonify({"svg": svg, "class_count": class_count, "cached": cached}) # return SVG
 
 @app.route('/download-pdf', methods=['POST']) # Download UML diagram as PDF
+@admission_limited("pdf")
 def download_pdf():
     try:
         data = request.get_json() # get JSON data
@@ -854,6 +2828,8 @@ def download_pdf():
         
         if not image_data:
             return jsonify({"success": False, "error": "No image data provided"}), 400 #400
+        if len(image_data) * 3 // 4 > app.config['MAX_IMAGE_BYTES']: # decoded size, checked before decoding
+            return jsonify({"success": False, "error": "Image too large"}), 413 #413
         
         # Remove data URL prefix if present
         if ',' in image_data:
@@ -866,6 +2842,10 @@ def download_pdf():
         # Create PDF in memory
         pdf_buffer = BytesIO() # PDF buffer
         
+        from reportlab.lib.pagesizes import A4, landscape # PDF export only: keep reportlab out of startup
+        from reportlab.lib.utils import ImageReader
+        from reportlab.pdfgen import canvas
+
         # Use landscape A4 for better diagram visibility
         page_width, page_height = landscape(A4) # landscape A4 dimensions
         
@@ -937,11 +2917,9 @@ def clear_session(): # Clear session data and temp files
                 shutil.rmtree(folder) # remove session folder
 
         session.clear() # clear session data
-        parameters_list.clear() # reset parameters
-        parameter_relations.clear() # reset relations
-        uml_data.clear() # reset UML data
-        abbrev_to_param.clear() # reset mappings
-        param_to_abbrev.clear() # reset mappings
+        reset_model() # reset parameters, relations, UML data and mappings
+        if app.config['MODEL_SNAPSHOT'] and os.path.exists(app.config['MODEL_SNAPSHOT']):
+            os.remove(app.config['MODEL_SNAPSHOT']) # other workers drop the shared model too
 
         return jsonify({"success": True, "message": "Session cleared"}) #200
     except Exception as e:
@@ -961,6 +2939,8 @@ def get_available_files(): # List files in uploads folder
         if not os.path.exists(upload_folder): # create if missing
             os.makedirs(upload_folder, exist_ok=True) # create if missing
 
+        ensure_corpus_index() # build the search index in the background
+
         for filename in os.listdir(upload_folder): # list files
             file_path = os.path.join(upload_folder, filename) # full path
             if os.path.isfile(file_path) and filename.lower().endswith(('.xls', '.xlsx', '.xlsm')): # only Excel files
@@ -974,5 +2954,86 @@ def get_available_files(): # List files in uploads folder
         return jsonify({"success": False, "files": [], "error": str(e)}) #500
 
 
+# ----------------- Boot: import budget and model preload -----------------
+boot_status = {"import_ms": None, "preload": "off", "source": None, "files": [], "preload_ms": None, "error": None} # reported by /boot-status
+
+
+PRELOAD_LOCK_TIMEOUT = 300 # seconds after which a preload lock counts as abandoned
+
+
+def snapshot_holds(snapshot_path, file_paths):
+    """True if the snapshot file exists and was written from these files"""
+    try:
+        return ModelSnapshot(snapshot_path).header["files"] == files_signature(file_paths)
+    except (OSError, ValueError):
+        return False
+
+
+def preload_model(file_paths):
+    """
+    Load the configured report set at boot: attach the shared snapshot if it holds these files, else parse them.
+    With a snapshot configured, only the process holding the preload lock parses; the others
+    (e.g. the other gunicorn workers) wait for its snapshot and attach it.
+    """
+    started = time.perf_counter()
+    boot_status.update(preload="loading", files=[os.path.basename(path) for path in file_paths])
+    try:
+        snapshot_path = app.config['MODEL_SNAPSHOT']
+        source = "snapshot" # written by an earlier run or another worker
+        if snapshot_path and not snapshot_holds(snapshot_path, file_paths):
+            lock_path = f"{snapshot_path}.lock"
+            if acquire_lock_file(lock_path, PRELOAD_LOCK_TIMEOUT): # this process parses for everyone
+                try:
+                    load_uml_data(file_paths) # UML model
+                    load_excel_data(file_paths) # parameter model
+                    publish_model_snapshot(file_paths) # also attaches it here
+                    source = "workbooks"
+                finally:
+                    os.remove(lock_path)
+            else:
+                deadline = time.time() + PRELOAD_LOCK_TIMEOUT
+                while os.path.exists(lock_path) and time.time() < deadline: # another worker is parsing
+                    time.sleep(0.2)
+        if source == "snapshot":
+            if snapshot_path and snapshot_holds(snapshot_path, file_paths):
+                attach_model_snapshot(snapshot_path)
+            else: # no snapshot configured, or its writer failed: private model
+                load_uml_data(file_paths) # UML model
+                load_excel_data(file_paths) # parameter model
+                source = "workbooks"
+        get_relation_graph(file_paths) # relation adjacency
+        boot_status["source"] = source
+        boot_status["preload"] = "ready"
+    except Exception as e:
+        boot_status.update(preload="failed", error=str(e))
+        print(f"Preload failed: {e}") # log error
+    boot_status["preload_ms"] = round((time.perf_counter() - started) * 1000)
+
+
+def start_preload():
+    """Preload NIDD_PRELOAD in the background, so the server answers requests right away"""
+    file_paths = [path if os.path.exists(path) else os.path.join(app.config['UPLOAD_FOLDER'], path)
+                  for path in app.config['PRELOAD_FILES']] # names are looked up in uploads/
+    missing = [path for path in file_paths if not os.path.exists(path)]
+    if missing:
+        boot_status.update(preload="failed", error=f"Not found: {', '.join(missing)}")
+        return
+    threading.Thread(target=preload_model, args=(file_paths,), daemon=True).start()
+
+
+@app.route('/boot-status') # Startup timing and preload progress
+def get_boot_status():
+    return jsonify({**boot_status, "parameters": len(parameters_list), "classes": len(uml_data)})
+
+
+boot_status["import_ms"] = round((time.perf_counter() - BOOT_STARTED) * 1000) # cost of importing this module
+if app.config['IMPORT_BUDGET_MS'] and boot_status["import_ms"] > app.config['IMPORT_BUDGET_MS']:
+    heavy = [name for name in ("pandas", "numpy", "openpyxl", "reportlab") if name in sys.modules] # should load lazily
+    print(f"Import took {boot_status['import_ms']} ms (budget {app.config['IMPORT_BUDGET_MS']:.0f} ms); "
+          f"heavy modules loaded: {', '.join(heavy) or 'none'}")
+if app.config['PRELOAD_FILES'] and multiprocessing.parent_process() is None: # serving processes only, not parser workers
+    start_preload()
+
+
 if __name__ == '__main__': # pragma: no cover
     app.run(debug=True) # Set debug=False for production
\ No newline at end of file